@@ -0,0 +1,73 @@
+# Uso (desde PythonProject): python -m app.backtest --symbols BTCUSDT ETHUSDT --folds 5 --output backtest.json
+import argparse
+import asyncio
+import json
+
+from app.backtest.runner import BacktestRunner, DEFAULT_MIN_TRAIN
+from app.database.database import async_engine
+
+TABLE_COLUMNS = ("predictions", "mape", "direction_accuracy", "strategy_return", "buy_hold_return", "sharpe",
+                 "max_drawdown", "trades")
+
+
+async def load(runner: BacktestRunner, symbols: list, timeframes: list):
+    try:
+        return await runner.load(symbols, timeframes)
+    finally:
+        await async_engine.dispose()
+
+
+def format_value(value):
+    if value is None:
+        return "-"
+    return f"{value:.4f}" if isinstance(value, float) else str(value)
+
+
+def print_report(report: dict):
+    for timeframe, by_symbol in report["results"].items():
+        print(f"\n== {timeframe} ==")
+        print("\t".join(("symbol",) + TABLE_COLUMNS))
+        for symbol, metrics in sorted(by_symbol.items()):
+            if "error" in metrics:
+                print(f"{symbol}\terror: {metrics['error']}")
+            else:
+                print("\t".join([symbol] + [format_value(metrics[column]) for column in TABLE_COLUMNS]))
+    print("\n" + json.dumps(report["summary"], indent=2))
+    print(f"Tiempo: {report['elapsed_s']:.1f}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backtest walk-forward de las predicciones a corto y largo plazo")
+    parser.add_argument("--symbols", nargs="*", help="Por defecto, todos los símbolos con velas diarias")
+    parser.add_argument("--timeframes", nargs="+", default=["short", "long"], choices=["short", "long"])
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--min-train-short", type=int, default=DEFAULT_MIN_TRAIN["short"])
+    parser.add_argument("--min-train-long", type=int, default=DEFAULT_MIN_TRAIN["long"])
+    parser.add_argument("--threshold", type=float, default=0.05, help="Umbral de cambio de determine_action")
+    parser.add_argument("--fee-bps", type=float, default=10.0, help="Comisión por operación (puntos básicos)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--selected-orders", action="store_true",
+                        help="Usar los órdenes ARIMA seleccionados en lugar del orden por defecto")
+    parser.add_argument("--output", help="Fichero JSON con el informe completo")
+    args = parser.parse_args(argv)
+
+    runner = BacktestRunner(
+        folds=args.folds,
+        min_train={"short": args.min_train_short, "long": args.min_train_long},
+        threshold=args.threshold,
+        fee_bps=args.fee_bps,
+        workers=args.workers,
+        use_selected_orders=args.selected_orders,
+    )
+    frames = asyncio.run(load(runner, args.symbols, args.timeframes))
+    report = runner.run(frames)
+
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+# app/backtest/runner.py
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+from sqlalchemy import select
+
+from app.backtest.walk_forward import (
+    FEATURE_COLUMNS, add_backtest_features, evaluate, make_folds, run_long_fold, run_short_fold
+)
+from app.database.database import AsyncSessionLocal
+from app.models.arima_order_selection import ArimaOrderSelection
+from app.predictor.indicators import add_grouped_technical_indicators
+from app.predictor.prediction_service import ARIMA_ORDER, FORECAST_STEPS, TIMEFRAME_INTERVALS
+from app.services.history_service import HistoryService
+
+# Velas mínimas antes del primer tramo evaluado y velas por año de cada horizonte
+DEFAULT_MIN_TRAIN = {"short": 200, "long": 104}
+PERIODS_PER_YEAR = {"short": 365, "long": 52}
+
+SUMMARY_METRICS = ("mape", "direction_accuracy", "strategy_return", "buy_hold_return", "sharpe", "max_drawdown")
+
+
+class BacktestRunner:
+    """
+        Backtest walk-forward de los modelos de PredictionService sobre el histórico guardado.
+        Las features se calculan una sola vez para todos los símbolos (operaciones agrupadas de pandas)
+        y cada tramo (símbolo, horizonte, fold) se ajusta y predice en un pool de procesos.
+    """
+
+    def __init__(self, folds: int = 5, min_train: dict = None, threshold: float = 0.05, fee_bps: float = 10.0,
+                 horizon: int = FORECAST_STEPS, workers: int = None, use_selected_orders: bool = False):
+        self.folds = folds
+        self.min_train = {**DEFAULT_MIN_TRAIN, **(min_train or {})}
+        self.threshold = threshold
+        self.fee_bps = fee_bps
+        self.horizon = horizon
+        self.workers = workers
+        self.use_selected_orders = use_selected_orders
+        self.history_service = HistoryService()
+        self.orders = {}
+
+    async def load(self, symbols: list = None, timeframes=("short", "long")):
+        """
+            :param symbols: Símbolos a evaluar; por defecto todos los que tienen velas diarias.
+            :return: Diccionario horizonte -> DataFrame con el histórico de todos los símbolos.
+        """
+        async with AsyncSessionLocal() as db:
+            if not symbols:
+                symbols = await self.history_service.get_symbols(TIMEFRAME_INTERVALS["short"], db)
+            frames = {
+                timeframe: await self.history_service.load_many_frame(symbols, TIMEFRAME_INTERVALS[timeframe], db)
+                for timeframe in timeframes
+            }
+            if self.use_selected_orders:
+                # Órdenes elegidos con todo el histórico: sesgo de anticipación, útil solo para compararlos
+                rows = (await db.execute(select(ArimaOrderSelection).where(
+                    ArimaOrderSelection.interval == TIMEFRAME_INTERVALS["long"]
+                ))).scalars()
+                self.orders = {row.crypto_symbol: (row.p, row.d, row.q) for row in rows}
+        return frames
+
+    def _short_jobs(self, df):
+        df = add_backtest_features(add_grouped_technical_indicators(df))
+        for symbol, group in df.groupby("symbol", sort=False):
+            # Se descarta el calentamiento de los indicadores (rellenado después hacia delante, no hay huecos)
+            group = group[group["usable"].cummax()]
+            closes = group["close"].to_numpy(dtype=np.float64)
+            features = group[list(FEATURE_COLUMNS)].to_numpy(dtype=np.float64)
+            folds = make_folds(len(closes), self.min_train["short"], self.folds)
+            jobs = [(run_short_fold, (features[:end], closes[:start + 1], start, end)) for start, end in folds]
+            yield symbol, closes, folds, jobs
+
+    def _long_jobs(self, df):
+        for symbol, group in df.groupby("symbol", sort=False):
+            closes = group["close"].to_numpy(dtype=np.float64)
+            folds = make_folds(len(closes), self.min_train["long"], self.folds)
+            order = self.orders.get(symbol, ARIMA_ORDER)
+            jobs = [(run_long_fold, (closes[:end], start, end, order, self.horizon)) for start, end in folds]
+            yield symbol, closes, folds, jobs
+
+    def _realized(self, timeframe: str, closes, decision_index):
+        if timeframe == "short":
+            return closes[decision_index + 1]
+        # Media de los `horizon` cierres siguientes, conocida solo si el horizonte completo está en el histórico
+        cumulative = np.concatenate([[0.0], np.cumsum(closes)])
+        end = decision_index + 1 + self.horizon
+        realized = np.full(len(decision_index), np.nan)
+        complete = end <= len(closes)
+        realized[complete] = (cumulative[end[complete]] - cumulative[decision_index[complete] + 1]) / self.horizon
+        return realized
+
+    def run(self, frames: dict):
+        """
+            :param frames: Resultado de load().
+            :return: {"results": {horizonte: {símbolo: métricas}}, "summary": {...}, "elapsed_s": ...}
+        """
+        started = time.perf_counter()
+        job_builders = {"short": self._short_jobs, "long": self._long_jobs}
+        contexts, results = {}, {timeframe: {} for timeframe in frames}
+
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = {}
+            # Los ARIMA son los trabajos más largos: se encolan primero para repartir mejor la carga
+            for timeframe in sorted(frames, key=lambda timeframe: timeframe != "long"):
+                for symbol, closes, folds, jobs in job_builders[timeframe](frames[timeframe]):
+                    if not folds:
+                        results[timeframe][symbol] = {"error": "Not enough historical data for backtesting"}
+                        continue
+                    contexts[(timeframe, symbol)] = (closes, folds, {})
+                    for (start, _end), (func, args) in zip(folds, jobs):
+                        futures[pool.submit(func, *args)] = (timeframe, symbol, start)
+
+            for future in as_completed(futures):
+                timeframe, symbol, start = futures[future]
+                closes, folds, predictions = contexts[(timeframe, symbol)]
+                try:
+                    predictions[start] = future.result()
+                except Exception as e:
+                    results[timeframe][symbol] = {"error": str(e)}
+                    continue
+                if len(predictions) == len(folds) and symbol not in results[timeframe]:
+                    decision_index = np.arange(folds[0][0], folds[-1][1])
+                    predicted = np.concatenate([predictions[fold_start] for fold_start, _ in folds])
+                    results[timeframe][symbol] = evaluate(
+                        closes, decision_index, predicted, self._realized(timeframe, closes, decision_index),
+                        self.threshold, self.fee_bps, PERIODS_PER_YEAR[timeframe],
+                    )
+
+        return {
+            "results": results,
+            "summary": self.summarize(results),
+            "elapsed_s": time.perf_counter() - started,
+        }
+
+    def summarize(self, results: dict):
+        summary = {}
+        for timeframe, by_symbol in results.items():
+            evaluated = [metrics for metrics in by_symbol.values() if "error" not in metrics]
+            summary[timeframe] = {"symbols": len(evaluated), "failed": len(by_symbol) - len(evaluated)}
+            for metric in SUMMARY_METRICS:
+                values = [metrics[metric] for metrics in evaluated if metrics[metric] is not None]
+                summary[timeframe][f"median_{metric}"] = float(np.median(values)) if values else None
+        return summary
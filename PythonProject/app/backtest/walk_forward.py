@@ -0,0 +1,134 @@
+# app/backtest/walk_forward.py
+# Funciones puras del backtest: las de ajuste se ejecutan en el pool de procesos, por eso solo reciben arrays
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from app.predictor.fitting import fit_short_term_model, fit_arima
+
+# Mismas features que PredictionService.prepare_features salvo news_sentiment: en producción es un valor
+# constante en todas las filas (lo absorbe el término independiente) y no hay histórico de sentimiento.
+FEATURE_COLUMNS = ("close", "volume", "SMA_10", "EMA_10", "RSI")
+
+BUY, HOLD, SELL = 1, 0, -1
+ACTION_NAMES = {BUY: "comprar", HOLD: "aguantar", SELL: "vender"}
+
+
+def make_folds(n_rows: int, min_train: int, n_folds: int):
+    """
+        Divide las filas [min_train, n_rows - 1) en n_folds tramos consecutivos (la última fila no tiene
+        cierre siguiente con el que evaluar). Cada tramo se predice con lo ocurrido antes de su inicio.
+        :return: Lista de (inicio, fin) con fin excluido.
+    """
+    test_end = n_rows - 1
+    if test_end - min_train < n_folds:
+        return []
+    bounds = np.linspace(min_train, test_end, n_folds + 1).astype(int)
+    return [(int(start), int(end)) for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+
+
+def run_short_fold(features, closes, start: int, end: int):
+    """
+        Modelo de corto plazo: entrena con las filas [0, start) (objetivo: el cierre siguiente) y
+        predice el cierre siguiente de cada fila de [start, end).
+        :param closes: Cierres hasta al menos la fila `start` (objetivo de la última fila de entrenamiento).
+    """
+    model = fit_short_term_model(features[:start], closes[1:start + 1])
+    return model.predict(features[start:end])
+
+
+def _mean_forecasts(extended, horizon: int):
+    """
+        Media de los `horizon` pronósticos desde cada observación de `extended`, todas a la vez:
+        en un modelo invariante en el tiempo basta con propagar los estados predichos (a_{t+1|t}).
+        Equivale a llamar a forecast() desde cada origen. None si el modelo varía en el tiempo.
+    """
+    ssm = extended.model.ssm
+    obs_intercept = ssm.obs_intercept[0]
+    if ssm.design.shape[-1] != 1 or ssm.transition.shape[-1] != 1 or ssm.state_intercept.shape[-1] != 1 \
+            or not np.all(obs_intercept == obs_intercept[0]):
+        return None
+    design, transition = ssm.design[0, :, 0], ssm.transition[..., 0]
+    state_intercept = ssm.state_intercept[:, :1]
+
+    states = extended.predicted_state[:, 1:]
+    total = np.zeros(states.shape[1])
+    for _ in range(horizon):
+        total += design @ states + obs_intercept[0]
+        states = transition @ states + state_intercept
+    return total / horizon
+
+
+def run_long_fold(closes, start: int, end: int, order, horizon: int):
+    """
+        Modelo de largo plazo: ajusta el ARIMA con los cierres [0, start) y, para cada fila de [start, end),
+        extiende el estado con ese cierre (sin reestimar, como en producción) y predice la media
+        de los `horizon` cierres siguientes.
+    """
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        model_fit = fit_arima(closes[:start], order)
+        predictions = _mean_forecasts(model_fit.extend(closes[start:end]), horizon)
+        if predictions is None:
+            predictions = np.empty(end - start)
+            for i, close in enumerate(closes[start:end]):
+                model_fit = model_fit.extend([close])
+                predictions[i] = model_fit.forecast(steps=horizon).mean()
+    return predictions
+
+
+def add_backtest_features(df, group_column="symbol"):
+    """
+        Rellena hacia delante los indicadores dentro de cada símbolo y marca las filas utilizables.
+        A diferencia de prepare_features no se rellena hacia atrás: eso usaría datos futuros en el calentamiento.
+    """
+    columns = list(FEATURE_COLUMNS)
+    df[columns] = df.groupby(group_column, sort=False)[columns].ffill()
+    df["usable"] = np.isfinite(df[columns].to_numpy(dtype=np.float64)).all(axis=1)
+    return df
+
+
+def signals(current, predicted, threshold: float):
+    # Versión vectorizada de PredictionService.determine_action
+    change = (predicted - current) / current
+    return np.select([change > threshold, change < -threshold], [BUY, SELL], HOLD)
+
+
+def evaluate(closes, decision_index, predicted, realized, threshold: float, fee_bps: float, periods_per_year: int):
+    """
+        Métricas de error de la predicción y P&L de las señales.
+        Estrategia: 'comprar' abre posición, 'vender' la cierra y 'aguantar' mantiene la actual;
+        la posición decidida al cierre de una vela se mantiene hasta el cierre de la siguiente.
+        :param decision_index: Fila de cada predicción (se decide con el cierre de esa fila).
+        :param realized: Valor real comparable a cada predicción (NaN si aún no se conoce).
+    """
+    current = closes[decision_index]
+    next_close = closes[decision_index + 1]
+    actions = signals(current, predicted, threshold)
+
+    known = np.isfinite(realized)
+    error = predicted[known] - realized[known]
+    direction_hits = np.sign(predicted[known] - current[known]) == np.sign(realized[known] - current[known])
+
+    position = pd.Series(np.where(actions == BUY, 1.0, np.where(actions == SELL, 0.0, np.nan))).ffill().fillna(0.0).values
+    trades = np.abs(np.diff(position, prepend=0.0))
+    bar_returns = next_close / current - 1
+    strategy_returns = position * bar_returns - trades * fee_bps / 10_000
+    equity = np.cumprod(1 + strategy_returns)
+    volatility = strategy_returns.std()
+
+    return {
+        "predictions": int(len(predicted)),
+        "mae": float(np.abs(error).mean()) if known.any() else None,
+        "rmse": float(np.sqrt((error ** 2).mean())) if known.any() else None,
+        "mape": float((np.abs(error) / realized[known]).mean()) if known.any() else None,
+        "direction_accuracy": float(direction_hits.mean()) if known.any() else None,
+        "strategy_return": float(equity[-1] - 1),
+        "buy_hold_return": float(closes[decision_index[-1] + 1] / current[0] - 1),
+        "sharpe": float(strategy_returns.mean() / volatility * np.sqrt(periods_per_year)) if volatility > 0 else None,
+        "max_drawdown": float((equity / np.maximum.accumulate(equity) - 1).min()),
+        "exposure": float(position.mean()),
+        "trades": int(np.count_nonzero(trades)),
+        "signals": {ACTION_NAMES[code]: int(np.count_nonzero(actions == code)) for code in ACTION_NAMES},
+    }
@@ -0,0 +1,208 @@
+import asyncio
+import logging
+import re
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+
+from app.config import settings
+from app.database.database import async_engine
+
+logger = logging.getLogger(__name__)
+
+TABLE_NAME = "crypto_historical_prices"
+# Intervalos intradía ('1m', '4h'...): una partición por mes; el resto ('1d', '1w', '1M'): una por año
+MONTHLY_PARTITION_UNITS = ("m", "h")
+# Serializa la creación de particiones entre procesos (clave arbitraria de pg_advisory_xact_lock)
+PARTITION_LOCK_KEY = 7_301_001
+
+INTERVAL_PATTERN = re.compile(r"^\d{1,3}[mhdwM]$")
+RANGE_BOUND_PATTERN = re.compile(r"FROM \('?(-?\d+)'?\) TO \('?(-?\d+)'?\)")
+LIST_BOUND_PATTERN = re.compile(r"IN \('([^']+)'\)")
+
+
+@dataclass
+class CandlePartition:
+    name: str
+    interval: str
+    lower: int  # ms, incluido
+    upper: int  # ms, excluido
+
+
+def _to_ms(moment: datetime):
+    return int(moment.timestamp() * 1000)
+
+
+def partition_for(interval: str, timestamp: int):
+    """
+        :return: Partición (nombre y límites en ms) que contiene la vela de ese intervalo y timestamp.
+    """
+    moment = datetime.fromtimestamp(timestamp / 1000, tz=timezone.utc)
+    if interval[-1] in MONTHLY_PARTITION_UNITS:
+        start = datetime(moment.year, moment.month, 1, tzinfo=timezone.utc)
+        end = datetime(moment.year + moment.month // 12, moment.month % 12 + 1, 1, tzinfo=timezone.utc)
+        suffix = f"{moment.year}_{moment.month:02d}"
+    else:
+        start = datetime(moment.year, 1, 1, tzinfo=timezone.utc)
+        end = datetime(moment.year + 1, 1, 1, tzinfo=timezone.utc)
+        suffix = str(moment.year)
+    return CandlePartition(f"{TABLE_NAME}_{interval}_{suffix}", interval, _to_ms(start), _to_ms(end))
+
+
+class PartitionManager:
+    """
+        Particiones de crypto_historical_prices: LIST por intervalo y, dentro de cada intervalo, RANGE por tiempo.
+        Las particiones del periodo actual y el siguiente se crean por adelantado; las que aún falten se crean
+        antes de cada escritura, fuera de su transacción. Las antiguas se eliminan según la retención configurada
+        para su intervalo (DROP TABLE en lugar de DELETE masivos).
+    """
+
+    def __init__(self, engine=async_engine):
+        self.engine = engine
+        self._known = set()
+        self._task = None
+
+    async def ensure(self, interval: str, first_timestamp: int, last_timestamp: int = None):
+        """
+            Crea (si faltan) las particiones que cubren [first_timestamp, last_timestamp] para el intervalo.
+            Usa su propia transacción, corta y confirmada antes de escribir las velas: cada tabla se crea suelta
+            y se engancha con ATTACH PARTITION, que sobre la tabla padre solo toma SHARE UPDATE EXCLUSIVE.
+            Así no bloquea las lecturas del histórico ni espera a las transacciones de escritura abiertas.
+        """
+        if not INTERVAL_PATTERN.match(interval):
+            raise ValueError(f"Unsupported interval: {interval}")
+        if last_timestamp is None:
+            last_timestamp = first_timestamp
+
+        needed = []
+        timestamp = first_timestamp
+        while True:
+            partition = partition_for(interval, timestamp)
+            if partition.name not in self._known:
+                needed.append(partition)
+            if partition.upper > last_timestamp:
+                break
+            timestamp = partition.upper
+        if not needed:
+            return
+
+        interval_table = f"{TABLE_NAME}_{interval}"
+        async with self.engine.begin() as conn:
+            await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": PARTITION_LOCK_KEY})
+            # Si otra transacción tiene un bloqueo incompatible se falla pronto en lugar de dejar lecturas en cola
+            await conn.execute(text(f"SET LOCAL lock_timeout = '{settings.CANDLE_PARTITION_LOCK_TIMEOUT}'"))
+            result = await conn.execute(
+                text("SELECT relname FROM pg_class WHERE relname = ANY(:names)"),
+                {"names": [interval_table] + [partition.name for partition in needed]},
+            )
+            existing = set(result.scalars())
+            if interval_table not in existing:
+                await conn.execute(text(
+                    f'CREATE TABLE "{interval_table}" (LIKE {TABLE_NAME} INCLUDING DEFAULTS) '
+                    f"PARTITION BY RANGE (timestamp)"
+                ))
+                await conn.execute(text(
+                    f'ALTER TABLE {TABLE_NAME} ATTACH PARTITION "{interval_table}" FOR VALUES IN (\'{interval}\')'
+                ))
+            for partition in needed:
+                if partition.name not in existing:
+                    await conn.execute(text(
+                        f'CREATE TABLE "{partition.name}" (LIKE "{interval_table}" INCLUDING DEFAULTS)'
+                    ))
+                    await conn.execute(text(
+                        f'ALTER TABLE "{interval_table}" ATTACH PARTITION "{partition.name}" '
+                        f"FOR VALUES FROM ({partition.lower}) TO ({partition.upper})"
+                    ))
+        # Solo tras el commit: con un rollback la caché apuntaría a tablas inexistentes
+        self._known.update(partition.name for partition in needed)
+
+    async def ensure_upcoming(self, now_ms: int = None):
+        """
+            Crea por adelantado la partición actual y la siguiente de cada intervalo ya guardado,
+            para que las escrituras habituales nunca tengan que crear tablas.
+        """
+        now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+        async with self.engine.connect() as conn:
+            intervals = {partition.interval for partition in await self.list_partitions(conn)}
+        for interval in sorted(intervals):
+            current = partition_for(interval, now_ms)
+            await self.ensure(interval, current.lower, current.upper)
+
+    async def list_partitions(self, conn):
+        """
+            :param conn: Conexión o sesión asíncrona.
+            :return: Particiones hoja (intervalo y rango de tiempo), ordenadas por intervalo y fecha.
+        """
+        result = await conn.execute(text(
+            "SELECT child.relname, pg_get_expr(parent.relpartbound, parent.oid), "
+            "pg_get_expr(child.relpartbound, child.oid) "
+            "FROM pg_partition_tree(:table) tree "
+            "JOIN pg_class child ON child.oid = tree.relid "
+            "JOIN pg_class parent ON parent.oid = tree.parentrelid "
+            "WHERE tree.level = 2"
+        ), {"table": TABLE_NAME})
+        partitions = []
+        for name, interval_bound, range_bound in result:
+            interval_match = LIST_BOUND_PATTERN.search(interval_bound or "")
+            range_match = RANGE_BOUND_PATTERN.search(range_bound or "")
+            if interval_match and range_match:
+                partitions.append(CandlePartition(
+                    name, interval_match.group(1), int(range_match.group(1)), int(range_match.group(2))
+                ))
+        return sorted(partitions, key=lambda partition: (partition.interval, partition.lower))
+
+    async def drop_expired(self, retention_days: dict = None, now_ms: int = None):
+        """
+            Elimina las particiones cuyo rango termina antes del límite de retención de su intervalo.
+            :return: Nombres de las particiones eliminadas.
+        """
+        retention_days = settings.CANDLE_RETENTION_DAYS if retention_days is None else retention_days
+        if not retention_days:
+            return []
+        now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+
+        dropped = []
+        async with self.engine.begin() as conn:
+            await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": PARTITION_LOCK_KEY})
+            # DROP necesita un bloqueo exclusivo sobre la tabla padre: mejor reintentar en la siguiente
+            # pasada que dejar en cola (y bloqueadas detrás) las lecturas mientras termina una transacción larga
+            await conn.execute(text(f"SET LOCAL lock_timeout = '{settings.CANDLE_RETENTION_LOCK_TIMEOUT}'"))
+            for partition in await self.list_partitions(conn):
+                days = retention_days.get(partition.interval)
+                if days is not None and partition.upper <= now_ms - days * 86_400_000:
+                    await conn.execute(text(f'DROP TABLE "{partition.name}"'))
+                    dropped.append(partition.name)
+        self._known.difference_update(dropped)
+        return dropped
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._maintenance_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _maintenance_loop(self):
+        while True:
+            try:
+                await self.ensure_upcoming()
+            except Exception as e:
+                logger.warning(f"No se pudieron crear las particiones siguientes del histórico: {e}")
+            try:
+                dropped = await self.drop_expired()
+                if dropped:
+                    logger.info(f"Particiones caducadas eliminadas: {', '.join(dropped)}")
+            except Exception as e:
+                logger.warning(f"No se pudo aplicar la retención del histórico: {e}")
+            await asyncio.sleep(settings.CANDLE_RETENTION_CHECK_SECONDS)
+
+
+partition_manager = PartitionManager()
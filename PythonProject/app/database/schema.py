@@ -0,0 +1,26 @@
+# app/database/schema.py
+# Creación del esquema como paso previo al despliegue: python -m app.database.schema
+# (con DB_CREATE_SCHEMA_ON_STARTUP=false la API no lo intenta al arrancar)
+import asyncio
+
+from app.database.database import Base, async_engine, engine
+# Los modelos registran sus tablas en Base.metadata al importarse
+from app.models import arima_order_selection, crypto, crypto_historical_price, crypto_price  # noqa: F401
+
+
+def create_schema(bind=engine):
+    # Solo crea las tablas que falten; los cambios de columnas de tablas existentes no se aplican
+    Base.metadata.create_all(bind=bind)
+
+
+async def create_schema_async(timeout: float = None):
+    async def create():
+        async with async_engine.begin() as conn:
+            await conn.run_sync(create_schema)
+
+    await asyncio.wait_for(create(), timeout)
+
+
+if __name__ == "__main__":
+    create_schema()
+    print("Esquema creado")
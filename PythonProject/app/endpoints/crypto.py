@@ -1,9 +1,19 @@
 # app/endpoints/crypto.py
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
+import asyncio
+import json
+import math
+from contextlib import suppress
+
+from fastapi import APIRouter, HTTPException, Depends, Query, WebSocket
+from fastapi.responses import StreamingResponse
+from starlette.websockets import WebSocketState
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
 from app.database.database import get_db
+from app.schemas.crypto import BatchPredictionRequest
 from app.services.crypto_service import CryptoService
 from app.services.external_crypto import ExternalCryptoService
+from app.services.price_hub import price_hub
 from app.predictor.prediction_service import PredictionService
 
 class CryptoEndpoints:
@@ -12,45 +22,143 @@ class CryptoEndpoints:
         self.crypto_service = CryptoService()
         self.external_crypto_service = ExternalCryptoService()
         self.predictor = PredictionService()
+        self.price_hub = price_hub
         self.add_routes()
 
     def add_routes(self):
-        self.router.add_api_route("/cryptos/{symbol}", self.delete_crypto, methods=["DELETE"])
+        self.router.add_api_route("/cryptos/{symbol}", self.delete_crypto, methods=["DELETE"], dependencies=[Depends(get_db)])
         self.router.add_api_route("/cryptos/{symbol}/realtime", self.get_crypto_realtime_price, methods=["GET"])
+        self.router.add_api_route("/cryptos/{symbol}/realtime/stream", self.stream_crypto_realtime_price, methods=["GET"])
+        self.router.add_api_websocket_route("/cryptos/{symbol}/realtime/ws", self.websocket_crypto_realtime_price)
+        self.router.add_api_route("/predictions/cache/stats", self.get_prediction_cache_stats, methods=["GET"])
+        self.router.add_api_route("/predictions/batch", self.predict_batch, methods=["POST"], dependencies=[Depends(get_db)])
         self.router.add_api_route("/cryptos/{symbol}/predict", self.predict_price, methods=["GET"], dependencies=[Depends(get_db)])
         self.router.add_api_route("/cryptos/{symbol}/historical", self.fetch_and_store_historical_data, methods=["POST"], dependencies=[Depends(get_db)])
+        self.router.add_api_route("/cryptos/{symbol}/backfill", self.backfill_historical_data, methods=["POST"], dependencies=[Depends(get_db)])
+        self.router.add_api_route("/cryptos/{symbol}/indicators", self.get_crypto_indicators, methods=["GET"], dependencies=[Depends(get_db)])
         self.router.add_api_route("/cryptos/{symbol}/trends", self.get_crypto_trends, methods=["GET"])
         self.router.add_api_route("/cryptos/{symbol}/mentions", self.get_social_mentions, methods=["GET"])
         self.router.add_api_route("/cryptos/{symbol}/news", self.get_crypto_news, methods=["GET"])
 
-    async def delete_crypto(self, symbol: str):
-        await self.crypto_service.delete_crypto_and_historical_data(symbol)
+    async def delete_crypto(self, symbol: str, db: AsyncSession = Depends(get_db)):
+        await self.crypto_service.delete_crypto_and_historical_data(symbol, db)
         return {"detail": f"Crypto {symbol} deleted successfully"}
 
     async def get_crypto_realtime_price(self, symbol: str):
-        price_data = await self.crypto_service.get_crypto_price_from_api(symbol)
+        # Se sirve desde el hub; solo se consulta Binance si el hub no tiene un precio reciente
+        price_data = self.price_hub.get_price(symbol)
+        if price_data is None:
+            price_data = await self.crypto_service.get_crypto_price_from_api(symbol)
+            if price_data is not None:
+                self.price_hub.publish(symbol, price_data["price"])
         if price_data is None:
             raise HTTPException(status_code=404, detail="Price data not found")
         return price_data
 
-    async def predict_price(self, symbol: str, timeframe: str, db: Session = Depends(get_db)):
+    async def stream_crypto_realtime_price(self, symbol: str):
+        async def events():
+            with self.price_hub.subscribe(symbol) as queue:
+                current = self.price_hub.get_price(symbol)
+                if current is not None:
+                    yield f"data: {json.dumps(current)}\n\n"
+                while True:
+                    try:
+                        update = await asyncio.wait_for(queue.get(), timeout=15)
+                    except asyncio.TimeoutError:
+                        # Comentario SSE para mantener viva la conexión
+                        yield ": keep-alive\n\n"
+                        continue
+                    yield f"data: {json.dumps({'symbol': symbol, 'price': update['price']})}\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    async def websocket_crypto_realtime_price(self, websocket: WebSocket, symbol: str):
+        await websocket.accept()
+
+        async def send_updates(queue):
+            current = self.price_hub.get_price(symbol)
+            if current is not None:
+                await websocket.send_json(current)
+            while True:
+                update = await queue.get()
+                await websocket.send_json({"symbol": symbol, "price": update["price"]})
+
+        async def wait_disconnect():
+            # Se lee del socket en paralelo: la desconexión se detecta aunque el precio no cambie
+            while (await websocket.receive())["type"] != "websocket.disconnect":
+                pass
+
+        with self.price_hub.subscribe(symbol) as queue:
+            tasks = [asyncio.create_task(send_updates(queue)), asyncio.create_task(wait_disconnect())]
+            try:
+                await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                for task in tasks:
+                    task.cancel()
+            # Errores de envío tras el cierre (WebSocketDisconnect, RuntimeError...) solo terminan la conexión
+            await asyncio.gather(*tasks, return_exceptions=True)
+        if websocket.client_state == WebSocketState.CONNECTED:
+            with suppress(Exception):
+                await websocket.close()
+
+    async def predict_price(self, symbol: str, timeframe: str, db: AsyncSession = Depends(get_db)):
         try:
             prediction = await self.predictor.predict_crypto_price(symbol, timeframe, db)
             return prediction
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(status_code=400, detail=str(e))
 
-    async def fetch_and_store_historical_data(self, symbol: str, db: Session = Depends(get_db)):
+    async def predict_batch(self, request: BatchPredictionRequest, db: AsyncSession = Depends(get_db)):
+        if len(request.symbols) > settings.BATCH_MAX_SYMBOLS:
+            raise HTTPException(status_code=400, detail=f"Máximo {settings.BATCH_MAX_SYMBOLS} símbolos por lote.")
         try:
+            items = await self.predictor.prepare_batch(request.symbols, request.timeframes, db)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        results = self.predictor.iter_batch_predictions(items)
+        stream = request.stream if request.stream is not None else len(items) > settings.BATCH_STREAM_THRESHOLD
+        if stream:
+            return StreamingResponse(
+                (json.dumps(result) + "\n" async for result in results),
+                media_type="application/x-ndjson"
+            )
+        return {"results": [result async for result in results]}
+
+    async def get_prediction_cache_stats(self):
+        return self.predictor.prediction_cache.stats()
+
+    async def fetch_and_store_historical_data(self, symbol: str, db: AsyncSession = Depends(get_db)):
+        try:
+            # Las velas semanales se derivan de las diarias (rollup), no se descargan aparte
             await self.crypto_service.save_historical_data_to_db(symbol, "1d", db)
-            await self.crypto_service.save_historical_data_to_db(symbol, "1w", db)
             return {"detail": f"Historical data for {symbol} saved successfully"}
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
 
+    async def backfill_historical_data(self, symbol: str, interval: str, start_time: int, end_time: int = None,
+                                       concurrency: int = Query(None, ge=1, le=settings.BINANCE_BACKFILL_MAX_CONCURRENCY),
+                                       db: AsyncSession = Depends(get_db)):
+        try:
+            saved = await self.crypto_service.backfill_historical_data(symbol, interval, start_time, end_time, db, concurrency)
+            return {"detail": f"Backfill for {symbol} ({interval}) completed", "candles": saved}
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+    async def get_crypto_indicators(self, symbol: str, interval: str = "1d", db: AsyncSession = Depends(get_db)):
+        latest = await self.predictor.indicator_engine.latest(symbol, interval, db)
+        if not latest:
+            raise HTTPException(status_code=404, detail="No se encontraron datos históricos.")
+        # NaN (ventana aún incompleta) no es JSON válido
+        indicators = {name: None if isinstance(value, float) and math.isnan(value) else value
+                      for name, value in latest.items()}
+        return {"symbol": symbol, "interval": interval, "indicators": indicators}
+
     async def get_crypto_trends(self, symbol: str, timeframe: str = "today 12-m"):
         try:
-            trends = self.external_crypto_service.fetch_google_trends_data(symbol, timeframe)
+            trends = await self.external_crypto_service.fetch_google_trends_data(symbol, timeframe)
             if not trends:
                 raise HTTPException(status_code=404, detail="No se encontraron datos de tendencias.")
             return {"symbol": symbol, "trends": trends}
@@ -3,3 +3,11 @@ from fastapi import HTTPException
 class RateLimitExceededException(HTTPException):
     def __init__(self):
         super().__init__(status_code=429, detail="Has excedido el límite de peticiones. Intenta más tarde.")
+
+class PredictorBusyException(HTTPException):
+    def __init__(self):
+        super().__init__(status_code=503, detail="El servicio de predicción está saturado. Intenta más tarde.")
+
+class PredictionTimeoutException(HTTPException):
+    def __init__(self):
+        super().__init__(status_code=504, detail="La predicción tardó demasiado en completarse.")
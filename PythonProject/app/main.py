@@ -1,25 +1,133 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager, suppress
+
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Response
+from starlette.concurrency import run_in_threadpool
 from app.endpoints import crypto
 
-from app.models.crypto import Base
-from app.database.database import engine
+from app.database.database import async_engine, pool_stats
+from app.database.partitions import partition_manager
+from app.database.schema import create_schema_async
+from app.config import settings
+from app.predictor.executor import model_executor
+from app.predictor.fitting import load_model_libraries
+from app.predictor.model_registry import model_registry
+from app.predictor.order_search import arima_order_search
+from app.services.http_client import open_http_clients, close_http_clients
+from app.services.price_hub import price_hub
+from app.services.sentiment_service import sentiment_service
+from app.services.rate_limiter import binance_weight_limiter
+from app.services.trends_service import trends_service
+from app.utils import metrics
+from app.utils.middleware import InstrumentationMiddleware
+
+logger = logging.getLogger(__name__)
+
+
+async def restore_state(timeout: float):
+    """
+        Estado guardado que las primeras predicciones necesitan, cargado antes de servir (lecturas baratas).
+        Sin los órdenes ARIMA elegidos ni los modelos del registro, una predicción temprana ajustaría desde cero
+        con el orden por defecto y sobrescribiría el modelo guardado. Cada carga está acotada por `timeout`.
+    """
+    async def load_models():
+        # Modelos ya ajustados en disco: las primeras predicciones no tienen que reajustarlos
+        return await run_in_threadpool(model_registry.load_all, settings.MODEL_PRELOAD_LIMIT)
+
+    results = await asyncio.gather(
+        asyncio.wait_for(load_models(), timeout),
+        asyncio.wait_for(arima_order_search.load(), timeout),
+        return_exceptions=True,
+    )
+    for name, result in zip(("modelos guardados", "órdenes ARIMA seleccionados"), results):
+        if isinstance(result, BaseException):
+            logger.warning(f"No se pudieron cargar los {name}: {result!r}")
+
+
+async def warm_up():
+    """
+        Calentamiento en segundo plano: la API ya responde mientras se importan las librerías de los modelos
+        (en este proceso y en los workers) y se crea el analizador de sentimiento.
+    """
+    try:
+        await run_in_threadpool(load_model_libraries)
+        await model_executor.warm_up(load_model_libraries)
+        await run_in_threadpool(lambda: sentiment_service.analyzer)
+    except Exception as e:
+        logger.warning(f"Calentamiento incompleto: {e!r}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Un cliente HTTP con pool de conexiones por API externa durante toda la vida de la app
+    open_http_clients()
+    # Sin base de datos la API arranca igualmente: los endpoints que la usan fallan hasta que responda
+    if settings.DB_CREATE_SCHEMA_ON_STARTUP:
+        try:
+            await create_schema_async(settings.DB_STARTUP_TIMEOUT_SECONDS)
+        except Exception as e:
+            logger.warning(f"No se pudo crear el esquema de la base de datos: {e!r}")
+    # Una única conexión a Binance alimenta los precios en tiempo real de todos los clientes
+    if settings.PRICE_HUB_ENABLED:
+        price_hub.start()
+    sentiment_service.start()
+    trends_service.start()
+    # Particiones del histórico: se crean las siguientes por adelantado y la retención elimina particiones completas
+    partition_manager.start()
+    await restore_state(settings.DB_STARTUP_TIMEOUT_SECONDS)
+    arima_order_search.start()
+    warm_up_task = asyncio.create_task(warm_up()) if settings.WARMUP_ON_STARTUP else None
+    yield
+    if warm_up_task is not None:
+        warm_up_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await warm_up_task
+    await partition_manager.stop()
+    await arima_order_search.stop()
+    await trends_service.stop()
+    await sentiment_service.stop()
+    await price_hub.stop()
+    await close_http_clients()
+    model_executor.shutdown()
+    await async_engine.dispose()
+
 
 app = FastAPI(
     title="Crypto Tracker API",
     description="API destinada a la consulta y predicción de precios de criptomonedas",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
-Base.metadata.create_all(bind=engine)
-
 # Incluir el router de criptomonedas
 app.include_router(crypto.router, prefix="/api/v1/crypto")
 
+app.add_middleware(InstrumentationMiddleware)
+
+# Estado de cachés y pools, leído en cada consulta a /metrics
+metrics.register_stats_source("prediction_cache", crypto.crypto_endpoints.predictor.prediction_cache.stats)
+metrics.register_stats_source("model_executor", model_executor.stats)
+metrics.register_stats_source("arima_order_search", arima_order_search.stats)
+metrics.register_stats_source("db_pool", pool_stats)
+metrics.register_stats_source("binance_weight", binance_weight_limiter.stats)
+metrics.register_stats_source("price_hub", price_hub.stats)
+metrics.register_stats_source("sentiment", sentiment_service.stats)
+metrics.register_stats_source("trends", trends_service.stats)
+
 
 @app.get("/ping")
 async def ping():
     return {"message": "API is running"}
 
+
+@app.get("/metrics")
+async def get_metrics():
+    if not metrics.enabled:
+        raise HTTPException(status_code=503, detail="Métricas desactivadas o prometheus_client no está instalado.")
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
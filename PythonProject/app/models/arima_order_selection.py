@@ -0,0 +1,21 @@
+from datetime import datetime
+
+from sqlalchemy import Column, String, Integer, Float, BigInteger, DateTime
+
+from app.database.database import Base
+
+
+class ArimaOrderSelection(Base):
+    __tablename__ = "arima_order_selections"
+
+    crypto_symbol = Column(String(10), primary_key=True)  # Símbolo (BTC, ETH)
+    interval = Column(String(5), primary_key=True)  # Intervalo de las velas ('1w')
+    p = Column(Integer, nullable=False)
+    d = Column(Integer, nullable=False)
+    q = Column(Integer, nullable=False)
+    criterion = Column(String(3), nullable=False)  # 'aic' o 'bic'
+    score = Column(Float, nullable=False)  # Valor del criterio para el orden elegido
+    candidates_evaluated = Column(Integer, nullable=False)
+    n_obs = Column(Integer, nullable=False)
+    watermark = Column(BigInteger, nullable=False)  # Última vela usada en la búsqueda (ms)
+    selected_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -1,10 +1,21 @@
-from sqlalchemy import Column, Integer, String, Float, BigInteger
+from sqlalchemy import Column, String, Float, BigInteger, PrimaryKeyConstraint
 from app.database.database import Base
 
 class CryptoHistoricalPrice(Base):
     __tablename__ = "crypto_historical_prices"
+    __table_args__ = (
+        # Una vela por símbolo, intervalo y apertura: clave de los upserts masivos.
+        # Incluye close y volume para que las lecturas de histórico se resuelvan solo con el índice.
+        PrimaryKeyConstraint(
+            "crypto_symbol", "interval", "timestamp",
+            name="pk_crypto_historical_prices",
+            postgresql_include=["close", "volume"],
+        ),
+        # Particionada por intervalo y, dentro de cada intervalo, por rango de tiempo
+        # (las particiones hijas las crea app.database.partitions)
+        {"postgresql_partition_by": "LIST (interval)"},
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
     crypto_symbol = Column(String(10), nullable=False)  # Símbolo (BTC, ETH)
     timestamp = Column(BigInteger, nullable=False)  # Fecha en milisegundos
     open = Column(Float, nullable=False)  # Precio de apertura
@@ -12,4 +23,4 @@ class CryptoHistoricalPrice(Base):
     low = Column(Float, nullable=False)  # Precio más bajo
     close = Column(Float, nullable=False)  # Precio de cierre
     volume = Column(Float, nullable=False)  # Volumen negociado
-    interval = Column(String(5), nullable=False)  # Intervalo ('1d', '1w')
\ No newline at end of file
+    interval = Column(String(5), nullable=False)  # Intervalo ('1d', '1w')
@@ -0,0 +1,94 @@
+# app/predictor/executor.py
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+
+from app.config import settings
+from app.exceptions.custom_exceptions import PredictorBusyException, PredictionTimeoutException
+
+
+class ModelExecutor:
+    """
+        Ejecuta el trabajo de CPU de los modelos fuera del event loop, en un pool de procesos o de hilos.
+        La cola está acotada: con max_pending trabajos sin terminar se rechazan los nuevos (503).
+        Si un proceso del pool muere (falta de memoria, fallo nativo en un ajuste) el pool queda roto:
+        se descarta, el trabajo responde 503 y la siguiente llamada crea uno nuevo.
+    """
+
+    def __init__(self, kind: str, max_workers: int, max_pending: int, timeout: float):
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._pool = None
+        self._pending = 0
+
+    def _get_pool(self):
+        if self._pool is None:
+            if self.kind == "process":
+                # spawn evita heredar los hilos del servidor al hacer fork
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="model-worker")
+        return self._pool
+
+    def _release(self, _future):
+        self._pending -= 1
+
+    def _discard_pool(self, pool):
+        # Solo si sigue siendo el actual: otra llamada puede haber creado ya el de reemplazo
+        if self._pool is pool:
+            self._pool = None
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    async def run(self, func, *args, **kwargs):
+        if self._pending >= self.max_pending:
+            raise PredictorBusyException()
+
+        loop = asyncio.get_running_loop()
+        pool = self._get_pool()
+        try:
+            job = pool.submit(partial(func, *args, **kwargs))
+        except BrokenProcessPool:
+            self._discard_pool(pool)
+            raise PredictorBusyException()
+        self._pending += 1
+        # El hueco se libera cuando el trabajo acaba de verdad, no cuando vence el timeout
+        job.add_done_callback(lambda future: loop.call_soon_threadsafe(self._release, future))
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(job), self.timeout)
+        except asyncio.TimeoutError:
+            raise PredictionTimeoutException()
+        except BrokenProcessPool:
+            self._discard_pool(pool)
+            raise PredictorBusyException()
+
+    async def warm_up(self, func):
+        # Arranca los workers ejecutando func en cada uno (p. ej. importar las librerías de los modelos)
+        await asyncio.gather(*(self.run(func) for _ in range(min(self.max_workers, self.max_pending))))
+
+    def stats(self):
+        return {
+            "kind": self.kind,
+            "workers": self.max_workers,
+            "pending": self._pending,
+            "max_pending": self.max_pending,
+        }
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+model_executor = ModelExecutor(
+    settings.PREDICTION_EXECUTOR,
+    settings.PREDICTION_WORKERS,
+    settings.PREDICTION_MAX_PENDING_JOBS,
+    settings.PREDICTION_JOB_TIMEOUT_SECONDS,
+)
@@ -0,0 +1,79 @@
+# app/predictor/fitting.py
+# Funciones puras de ajuste de modelos: se ejecutan en el pool de workers, por eso reciben y devuelven datos serializables.
+# scikit-learn y statsmodels (y pandas con ellos) se importan al primer ajuste o en el calentamiento:
+# son la mayor parte del tiempo de arranque.
+import warnings
+
+import numpy as np
+
+
+def load_model_libraries():
+    # Calentamiento: deja importadas las librerías de los modelos en el proceso que lo ejecute
+    import sklearn.linear_model  # noqa: F401
+    import statsmodels.tsa.arima.model  # noqa: F401
+    import statsmodels.tsa.stattools  # noqa: F401
+
+
+def fit_short_term_model(X_train, y_train):
+    from sklearn.linear_model import LinearRegression
+
+    model = LinearRegression()
+    model.fit(X_train, y_train)
+    return model
+
+
+def fit_arima(close_values, order=(5, 1, 0)):
+    from statsmodels.tsa.arima.model import ARIMA
+
+    return ARIMA(close_values, order=order).fit()
+
+
+def update_arima(model_fit, new_values):
+    # Extiende el estado del modelo con las nuevas observaciones sin reestimar los parámetros
+    return model_fit.append(new_values, refit=False)
+
+
+def forecast_arima(model_fit, pending_values, steps=30):
+    # pending_values: observaciones provisionales (la vela aún abierta) que no se guardan en el modelo
+    if len(pending_values):
+        model_fit = model_fit.append(pending_values, refit=False)
+    return float(model_fit.forecast(steps=steps).mean())
+
+
+def select_differencing(close_values, max_d=2, alpha=0.05):
+    # Menor d para el que la serie diferenciada es estacionaria según el test ADF
+    from statsmodels.tsa.stattools import adfuller
+
+    values = np.asarray(close_values, dtype=float)
+    for d in range(max_d + 1):
+        try:
+            if adfuller(np.diff(values, n=d), autolag="AIC")[1] < alpha:
+                return d
+        except (ValueError, np.linalg.LinAlgError):
+            pass
+    return max_d
+
+
+def score_arima_order(close_values, order, criterion="aic"):
+    # Criterio de información del orden dado; None si el ajuste falla
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            score = getattr(fit_arima(close_values, order), criterion)
+    except (ValueError, np.linalg.LinAlgError):
+        return None
+    return float(score) if np.isfinite(score) else None
+
+
+def arima_drift_ratio(close_values, order, recent):
+    """
+        Varianza de los últimos `recent` residuos respecto a la de los anteriores.
+        Se descartan los primeros residuos, dominados por la inicialización del modelo.
+    """
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        residuals = np.asarray(fit_arima(close_values, order).resid)[order[0] + order[1] + 1:]
+    if len(residuals) < 2 * recent:
+        return None
+    baseline = np.mean(residuals[:-recent] ** 2)
+    return float(np.mean(residuals[-recent:] ** 2) / baseline) if baseline > 0 else None
@@ -0,0 +1,274 @@
+# app/predictor/indicators.py
+import copy
+import math
+from array import array
+from collections import deque
+
+import numpy as np
+from starlette.concurrency import run_in_threadpool
+
+from app.services.history_service import HistoryService
+
+
+# Indicadores técnicos calculados para varios símbolos a la vez sobre un único DataFrame
+
+
+def _per_group(grouped_result):
+    # groupby().rolling()/ewm() devuelven un índice (grupo, índice original): se vuelve al índice original
+    return grouped_result.reset_index(level=0, drop=True)
+
+
+def add_grouped_technical_indicators(df, group_column="symbol", sma_window=10, ema_span=10, rsi_window=14):
+    """
+        Equivalente a PredictionService.add_technical_indicators aplicado por separado a cada símbolo,
+        pero con operaciones agrupadas de pandas en lugar de un bucle por símbolo.
+        :param df: DataFrame con las columnas group_column y close, ordenado por timestamp dentro de cada grupo.
+    """
+    groups = df[group_column]
+    grouped_close = df.groupby(groups, sort=False)["close"]
+
+    df["SMA_10"] = _per_group(grouped_close.rolling(window=sma_window).mean())
+    df["EMA_10"] = _per_group(grouped_close.ewm(span=ema_span, adjust=False).mean())
+
+    delta = grouped_close.diff()
+    gain = _per_group(delta.where(delta > 0, 0).groupby(groups, sort=False).rolling(window=rsi_window).mean())
+    loss = _per_group((-delta.where(delta < 0, 0)).groupby(groups, sort=False).rolling(window=rsi_window).mean())
+    rs = gain / loss
+    df["RSI"] = 100 - (100 / (1 + rs))
+    return df
+
+
+# Motor incremental: cada indicador mantiene un estado que se actualiza en O(1) por vela nueva.
+# Los valores coinciden con los de pandas usados en PredictionService.add_technical_indicators.
+
+NAN = float("nan")
+
+
+class RollingMean:
+    def __init__(self, window: int):
+        self.window = window
+        self.values = deque(maxlen=window)
+
+    def update(self, value: float):
+        self.values.append(value)
+        if len(self.values) < self.window:
+            return NAN
+        return math.fsum(self.values) / self.window
+
+
+class SMA(RollingMean):
+    pass
+
+
+class EMA:
+    # Equivalente a ewm(span=span, adjust=False).mean()
+    def __init__(self, span: int = None, alpha: float = None):
+        self.alpha = alpha if alpha is not None else 2 / (span + 1)
+        self.value = None
+
+    def update(self, value: float):
+        if self.value is None:
+            self.value = value
+        else:
+            self.value = self.alpha * value + (1 - self.alpha) * self.value
+        return self.value
+
+
+class RSI:
+    """
+        method="simple": medias móviles simples de ganancias y pérdidas (como calculate_rsi).
+        method="wilder": suavizado de Wilder, ewm(alpha=1/window, adjust=False) con min_periods=window.
+    """
+
+    def __init__(self, window: int = 14, method: str = "simple"):
+        self.window = window
+        self.method = method
+        self.previous = None
+        self.count = 0
+        if method == "wilder":
+            self.gains, self.losses = EMA(alpha=1 / window), EMA(alpha=1 / window)
+        else:
+            self.gains, self.losses = RollingMean(window), RollingMean(window)
+
+    def update(self, close: float):
+        # La primera vela no tiene variación: pandas la cuenta como ganancia y pérdida 0
+        delta = 0.0 if self.previous is None else close - self.previous
+        self.previous = close
+        self.count += 1
+        gain = self.gains.update(delta if delta > 0 else 0.0)
+        loss = self.losses.update(-delta if delta < 0 else 0.0)
+        if self.count < self.window or math.isnan(gain) or math.isnan(loss):
+            return NAN
+        if loss == 0:
+            return NAN if gain == 0 else 100.0
+        return 100 - (100 / (1 + gain / loss))
+
+
+class MACD:
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        self.fast, self.slow, self.signal = EMA(span=fast), EMA(span=slow), EMA(span=signal)
+
+    def update(self, close: float):
+        macd = self.fast.update(close) - self.slow.update(close)
+        signal = self.signal.update(macd)
+        return macd, signal, macd - signal
+
+
+class BollingerBands:
+    # Media de rolling(window) y desviación estándar muestral (ddof=1), como pandas
+    def __init__(self, window: int = 20, num_std: float = 2.0):
+        self.window = window
+        self.num_std = num_std
+        self.values = deque(maxlen=window)
+
+    def update(self, close: float):
+        self.values.append(close)
+        if len(self.values) < self.window:
+            return NAN, NAN, NAN
+        middle = math.fsum(self.values) / self.window
+        std = math.sqrt(math.fsum((value - middle) ** 2 for value in self.values) / (self.window - 1))
+        return middle + self.num_std * std, middle, middle - self.num_std * std
+
+
+# Columnas cuyo histórico completo se conserva (las que usan los modelos)
+SERIES_COLUMNS = ("SMA_10", "EMA_10", "RSI")
+
+
+class IndicatorState:
+    """
+        Estado de los indicadores de un (símbolo, intervalo).
+        Una vela con el mismo timestamp que la última (vela aún abierta) sustituye a la anterior.
+    """
+
+    def __init__(self):
+        self.indicators = {
+            "SMA_10": SMA(10),
+            "EMA_10": EMA(span=10),
+            "RSI": RSI(14),
+            "RSI_wilder": RSI(14, method="wilder"),
+            "MACD": MACD(),
+            "BB": BollingerBands(),
+        }
+        self.timestamps = array("q")
+        self.series = {column: array("d") for column in SERIES_COLUMNS}
+        self.latest = {}
+        self._before_last = None
+
+    @property
+    def last_timestamp(self):
+        return self.timestamps[-1] if self.timestamps else None
+
+    def update(self, timestamp: int, close: float, keep_undo: bool = True):
+        """
+            :param keep_undo: Guarda el estado previo para poder sustituir esta vela después;
+                              al sembrar solo hace falta para la última.
+        """
+        if self.timestamps and timestamp == self.timestamps[-1]:
+            if self._before_last is None:
+                raise ValueError("Last candle cannot be replaced")
+            self.indicators = self._before_last
+            self.timestamps.pop()
+            for values in self.series.values():
+                values.pop()
+        elif self.timestamps and timestamp < self.timestamps[-1]:
+            raise ValueError("Candles must be ingested in timestamp order")
+
+        self._before_last = copy.deepcopy(self.indicators) if keep_undo else None
+        values = {name: indicator.update(close) for name, indicator in self.indicators.items()}
+        macd, macd_signal, macd_hist = values.pop("MACD")
+        bb_upper, bb_middle, bb_lower = values.pop("BB")
+        values.update({
+            "MACD": macd, "MACD_signal": macd_signal, "MACD_hist": macd_hist,
+            "BB_upper": bb_upper, "BB_middle": bb_middle, "BB_lower": bb_lower,
+        })
+
+        self.timestamps.append(timestamp)
+        for column in SERIES_COLUMNS:
+            self.series[column].append(values[column])
+        self.latest = {"timestamp": timestamp, "close": close, **values}
+        return self.latest
+
+
+class IndicatorEngine:
+    """
+        Indicadores precalculados por (símbolo, intervalo).
+        El estado se siembra una vez desde la base de datos y avanza con cada vela ingerida.
+    """
+
+    def __init__(self):
+        self.history_service = HistoryService()
+        self._states = {}
+
+    def seed(self, symbol: str, interval: str, timestamps, closes):
+        state = IndicatorState()
+        last_index = len(timestamps) - 1
+        for index, (timestamp, close) in enumerate(zip(timestamps, closes)):
+            state.update(int(timestamp), float(close), keep_undo=index == last_index)
+        self._states[(symbol, interval)] = state
+        return state
+
+    async def seed_from_db(self, symbol: str, interval: str, db):
+        """
+            :return: Estado sembrado con todo el histórico, o None si no hay velas (no se guarda un estado vacío).
+        """
+        arrays = await self.history_service.load_arrays(symbol, interval, db, columns=("timestamp", "close"))
+        if not len(arrays["timestamp"]):
+            return None
+        return await run_in_threadpool(self.seed, symbol, interval, arrays["timestamp"], arrays["close"])
+
+    def ingest(self, symbol: str, interval: str, candles: list):
+        state = self._states.get((symbol, interval))
+        if state is None:
+            return
+        try:
+            for candle in sorted(candles, key=lambda candle: candle["timestamp"]):
+                if state.last_timestamp is None or candle["timestamp"] >= state.last_timestamp:
+                    state.update(candle["timestamp"], candle["close"])
+                else:
+                    # Velas anteriores a las ya procesadas (backfill): se vuelve a sembrar cuando se necesite
+                    raise ValueError("Out of order candle")
+        except ValueError:
+            self._states.pop((symbol, interval), None)
+
+    def needs_seed(self, symbol: str, interval: str, timestamps, closes):
+        # True si no hay estado o no corresponde a las velas dadas
+        state = self._states.get((symbol, interval))
+        return (
+            state is None
+            or len(state.timestamps) != len(timestamps)
+            or state.last_timestamp != int(timestamps[-1])
+            or state.latest["close"] != float(closes[-1])
+        )
+
+    def get_series(self, symbol: str, interval: str, timestamps, closes):
+        """
+            Series de SERIES_COLUMNS alineadas con las velas dadas.
+            Si el estado no existe o no corresponde a esas velas se siembra a partir de ellas.
+        """
+        if self.needs_seed(symbol, interval, timestamps, closes):
+            state = self.seed(symbol, interval, timestamps, closes)
+        else:
+            state = self._states[(symbol, interval)]
+        return {column: np.frombuffer(values, dtype=np.float64).copy() for column, values in state.series.items()}
+
+    async def latest(self, symbol: str, interval: str, db):
+        """
+            Últimos valores de los indicadores, o None si no hay histórico.
+            El estado se contrasta con la última vela guardada (consulta por índice): las velas escritas
+            por otros procesos (otros workers, scripts) no pasan por ingest() y obligan a volver a sembrar.
+        """
+        last = await self.history_service.load_arrays(symbol, interval, db, columns=("timestamp", "close"), lookback=1)
+        if not len(last["timestamp"]):
+            self._states.pop((symbol, interval), None)
+            return None
+        state = self._states.get((symbol, interval))
+        if (
+            state is None
+            or state.last_timestamp != int(last["timestamp"][-1])
+            or state.latest["close"] != float(last["close"][-1])
+        ):
+            state = await self.seed_from_db(symbol, interval, db)
+        return state.latest if state is not None else None
+
+
+indicator_engine = IndicatorEngine()
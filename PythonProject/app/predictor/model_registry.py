@@ -0,0 +1,84 @@
+# app/predictor/model_registry.py
+import glob
+import os
+import pickle
+import tempfile
+import time
+from contextlib import suppress
+
+from app.config import settings
+
+
+class ModelRegistry:
+    """
+        Almacén local de modelos ajustados, por símbolo y horizonte.
+        Cada entrada guarda el modelo y su marca de agua (timestamp de la última vela usada para ajustarlo)
+        y se persiste en disco como {symbol}_{timeframe}_{watermark}.pkl.
+    """
+
+    def __init__(self, store_dir: str):
+        self.store_dir = store_dir
+        self._entries = {}
+
+    def _path(self, symbol: str, timeframe: str, watermark: int):
+        return os.path.join(self.store_dir, f"{symbol}_{timeframe}_{watermark}.pkl")
+
+    def get(self, symbol: str, timeframe: str):
+        return self._entries.get((symbol, timeframe))
+
+    def put(self, symbol: str, timeframe: str, entry: dict):
+        self._entries[(symbol, timeframe)] = entry
+
+        os.makedirs(self.store_dir, exist_ok=True)
+        path = self._path(symbol, timeframe, entry["watermark"])
+        # Varios procesos pueden compartir el directorio: cada escritura usa su propio fichero temporal
+        fd, tmp_path = tempfile.mkstemp(dir=self.store_dir, prefix=f"{symbol}_{timeframe}_", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(entry, f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            with suppress(FileNotFoundError):
+                os.remove(tmp_path)
+            raise
+
+        # Solo se conserva la versión más reciente de cada modelo; otro proceso puede haberlas borrado ya
+        # o haber guardado una más nueva, que no se toca
+        prefix = os.path.join(self.store_dir, f"{symbol}_{timeframe}_")
+        for old_path in glob.glob(self._path(symbol, timeframe, "*")):
+            try:
+                old_watermark = int(old_path[len(prefix):-len(".pkl")])
+            except ValueError:
+                continue
+            if old_watermark < entry["watermark"]:
+                with suppress(FileNotFoundError):
+                    os.remove(old_path)
+
+    def needs_full_refit(self, entry: dict):
+        return (
+            time.time() - entry["fitted_at"] > settings.MODEL_FULL_REFIT_SECONDS
+            or entry["updates"] >= settings.MODEL_MAX_INCREMENTAL_UPDATES
+        )
+
+    def load_all(self, limit: int = None):
+        """
+            Carga en memoria los modelos guardados, empezando por los usados más recientemente.
+            :return: Número de modelos cargados.
+        """
+        paths = sorted(glob.glob(os.path.join(self.store_dir, "*.pkl")), key=os.path.getmtime, reverse=True)
+        loaded = 0
+        for path in paths[:limit]:
+            try:
+                with open(path, "rb") as f:
+                    entry = pickle.load(f)
+            except Exception:
+                continue
+            key = (entry["symbol"], entry["timeframe"])
+            # Con escrituras concurrentes puede quedar más de una versión: gana la de marca de agua mayor
+            if key not in self._entries or entry["watermark"] > self._entries[key]["watermark"]:
+                self._entries[key] = entry
+            loaded += 1
+        return loaded
+
+
+model_registry = ModelRegistry(settings.MODEL_STORE_DIR)
@@ -0,0 +1,207 @@
+# app/predictor/order_search.py
+import asyncio
+import logging
+import time
+from datetime import datetime
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+
+from app.config import settings
+from app.database.database import AsyncSessionLocal
+from app.models.arima_order_selection import ArimaOrderSelection
+from app.predictor.executor import ModelExecutor
+from app.predictor.fitting import select_differencing, score_arima_order, arima_drift_ratio
+from app.services.history_service import HistoryService
+
+logger = logging.getLogger(__name__)
+
+
+class ArimaOrderSearch:
+    """
+        Selección del orden (p, d, q) del ARIMA por (símbolo, intervalo) como trabajo en segundo plano.
+        d se fija con el test ADF; (p, q) se buscan por AIC/BIC en tandas paralelas, de menor a mayor
+        complejidad, y la búsqueda para tras ARIMA_SEARCH_PATIENCE tandas sin mejora.
+        El orden elegido se guarda en arima_order_selections y se reutiliza hasta que caduca o el modelo deriva.
+    """
+
+    def __init__(self, executor: ModelExecutor):
+        self.executor = executor
+        self.history_service = HistoryService()
+        self._selections = {}
+        self._tracked = set()
+        # Pares descartados por histórico corto -> instante (monotonic) a partir del cual se pueden volver a registrar
+        self._deferred = {}
+        self._checked = {}
+        self._wake = asyncio.Event()
+        self._task = None
+        self.searches = 0
+
+    @property
+    def enabled(self):
+        return settings.ARIMA_ORDER_SELECTION == "auto"
+
+    def get_order(self, symbol: str, interval: str):
+        """
+            Orden seleccionado para el par, o None si aún no hay selección.
+            El par queda registrado para que el trabajo en segundo plano lo busque, salvo que se haya
+            descartado hace menos de ARIMA_SEARCH_INTERVAL_SECONDS por no tener histórico suficiente.
+        """
+        if not self.enabled:
+            return None
+        key = (symbol, interval)
+        if key not in self._selections and key not in self._tracked and self._deferred.get(key, 0) <= time.monotonic():
+            self._tracked.add(key)
+            self._wake.set()
+        return self._selections.get(key)
+
+    async def search(self, close_values):
+        """
+            :return: (orden, valor del criterio, candidatos evaluados); orden None si ningún ajuste converge.
+        """
+        d = await self.executor.run(select_differencing, close_values, settings.ARIMA_MAX_D)
+        candidates = sorted(
+            ((p, d, q) for p in range(settings.ARIMA_MAX_P + 1) for q in range(settings.ARIMA_MAX_Q + 1)),
+            key=lambda order: (order[0] + order[2], order),
+        )
+        best_order, best_score = None, None
+        evaluated = stale = 0
+        for start in range(0, len(candidates), self.executor.max_workers):
+            wave = candidates[start:start + self.executor.max_workers]
+            scores = await asyncio.gather(
+                *(self.executor.run(score_arima_order, close_values, order, settings.ARIMA_CRITERION) for order in wave),
+                return_exceptions=True,
+            )
+            evaluated += len(wave)
+            improved = False
+            for order, score in zip(wave, scores):
+                if isinstance(score, float) and (best_score is None or score < best_score):
+                    best_order, best_score, improved = order, score, True
+            stale = 0 if improved else stale + 1
+            if best_order is not None and stale >= settings.ARIMA_SEARCH_PATIENCE:
+                break
+        self.searches += 1
+        return best_order, best_score, evaluated
+
+    async def load_selections(self, db):
+        rows = (await db.execute(select(ArimaOrderSelection))).scalars().all()
+        stored = {(row.crypto_symbol, row.interval): row for row in rows}
+        self._selections = {key: (row.p, row.d, row.q) for key, row in stored.items()}
+        return stored
+
+    async def load(self):
+        if self.enabled:
+            async with AsyncSessionLocal() as db:
+                await self.load_selections(db)
+
+    async def _needs_search(self, key, selection, closes, timestamps):
+        if selection is None:
+            return True
+        watermark = int(timestamps[-1])
+        if selection.watermark == watermark or self._checked.get(key) == watermark:
+            return False
+        if (datetime.utcnow() - selection.selected_at).total_seconds() > settings.ARIMA_SELECTION_MAX_AGE_SECONDS:
+            return True
+        if (timestamps > selection.watermark).sum() < settings.ARIMA_DRIFT_RECENT_OBS:
+            return False
+        ratio = await self.executor.run(
+            arima_drift_ratio, closes, (selection.p, selection.d, selection.q), settings.ARIMA_DRIFT_RECENT_OBS
+        )
+        self._checked[key] = watermark
+        return ratio is not None and ratio > settings.ARIMA_DRIFT_RATIO
+
+    async def refresh_key(self, symbol: str, interval: str, db, selection: ArimaOrderSelection = None):
+        """
+            Busca de nuevo el orden del par si no tiene selección, si la selección caducó o si hay deriva.
+            :return: Orden seleccionado, o None si no hubo búsqueda.
+        """
+        arrays = await self.history_service.load_arrays(symbol, interval, db, columns=("timestamp", "close"))
+        # Igual que el modelo, la búsqueda solo usa velas cerradas
+        closes, timestamps = arrays["close"][:-1], arrays["timestamp"][:-1]
+        if len(closes) < settings.ARIMA_SEARCH_MIN_OBS:
+            # Sin esto se recargaría su histórico en cada ciclo para siempre; vuelve a registrarse al predecir
+            if (symbol, interval) in self._tracked:
+                self._tracked.discard((symbol, interval))
+                self._deferred[(symbol, interval)] = time.monotonic() + settings.ARIMA_SEARCH_INTERVAL_SECONDS
+            return None
+        if not await self._needs_search((symbol, interval), selection, closes, timestamps):
+            return None
+
+        order, score, evaluated = await self.search(closes)
+        if order is None:
+            return None
+        values = {
+            "p": order[0], "d": order[1], "q": order[2],
+            "criterion": settings.ARIMA_CRITERION,
+            "score": score,
+            "candidates_evaluated": evaluated,
+            "n_obs": len(closes),
+            "watermark": int(timestamps[-1]),
+        }
+        stmt = insert(ArimaOrderSelection).values(crypto_symbol=symbol, interval=interval, **values)
+        stmt = stmt.on_conflict_do_update(index_elements=["crypto_symbol", "interval"], set_=values)
+        await db.execute(stmt)
+        await db.commit()
+        self._selections[(symbol, interval)] = order
+        self._tracked.discard((symbol, interval))
+        return order
+
+    async def refresh(self):
+        now = time.monotonic()
+        self._deferred = {key: until for key, until in self._deferred.items() if until > now}
+        async with AsyncSessionLocal() as db:
+            stored = await self.load_selections(db)
+            for symbol, interval in sorted(self._tracked | stored.keys()):
+                try:
+                    order = await self.refresh_key(symbol, interval, db, stored.get((symbol, interval)))
+                    if order is not None:
+                        logger.info(f"Orden ARIMA de {symbol} ({interval}): {order}")
+                except Exception as e:
+                    await db.rollback()
+                    logger.warning(f"No se pudo seleccionar el orden ARIMA de {symbol} ({interval}): {e}")
+
+    def start(self):
+        if self._task is None and self.enabled:
+            self._task = asyncio.create_task(self._search_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.executor.shutdown()
+
+    async def _search_loop(self):
+        while True:
+            self._wake.clear()
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning(f"Error en la selección de órdenes ARIMA: {e}")
+            try:
+                # Un par nuevo (get_order) despierta el bucle sin esperar al siguiente ciclo
+                await asyncio.wait_for(self._wake.wait(), settings.ARIMA_SEARCH_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "selections": len(self._selections),
+            "pending": len(self._tracked - self._selections.keys()),
+            "searches": self.searches,
+            "executor": self.executor.stats(),
+        }
+
+
+# Pool propio: la búsqueda no compite por los workers de /predict
+arima_order_search = ArimaOrderSearch(ModelExecutor(
+    settings.PREDICTION_EXECUTOR,
+    settings.ARIMA_SEARCH_WORKERS,
+    # Una tanda completa más el margen del test ADF
+    settings.ARIMA_SEARCH_WORKERS + 1,
+    settings.ARIMA_SEARCH_FIT_TIMEOUT_SECONDS,
+))
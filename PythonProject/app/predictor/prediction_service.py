@@ -1,17 +1,47 @@
 # app/predictor/prediction_service.py
-from sklearn.linear_model import LinearRegression
-from statsmodels.tsa.arima.model import ARIMA
+import asyncio
+import time
+
 import numpy as np
-import pandas as pd
-from sqlalchemy.orm import Session
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 
-from app.models.crypto_historical_price import CryptoHistoricalPrice
+from app.config import settings
+from app.database.database import AsyncSessionLocal
+from app.predictor.executor import model_executor
+from app.predictor.indicators import add_grouped_technical_indicators, indicator_engine
+from app.predictor.fitting import fit_short_term_model, fit_arima, update_arima, forecast_arima
+from app.predictor.model_registry import model_registry
+from app.predictor.order_search import arima_order_search
 from app.services.external_crypto import ExternalCryptoService
+from app.services.history_service import HistoryService
+from app.utils.cache import AsyncTTLCache
+from app.utils.metrics import timed
+
+# Intervalo de velas usado por cada horizonte de predicción
+TIMEFRAME_INTERVALS = {"short": "1d", "long": "1w"}
+
+# Orden por defecto mientras no haya uno seleccionado (o con ARIMA_ORDER_SELECTION=fixed)
+ARIMA_ORDER = (5, 1, 0)
+FORECAST_STEPS = 30
+
+# Cambiar al modificar los modelos o sus features para invalidar las predicciones cacheadas
+MODEL_VERSION = "2"
 
 
 class PredictionService:
     def __init__(self):
         self.external_crypto_service = ExternalCryptoService()
+        self.history_service = HistoryService()
+        self.executor = model_executor
+        self.model_registry = model_registry
+        self.order_search = arima_order_search
+        self.indicator_engine = indicator_engine
+        self.prediction_cache = AsyncTTLCache(
+            settings.PREDICTION_CACHE_MAX_ENTRIES,
+            settings.PREDICTION_CACHE_TTL_SECONDS
+        )
 
     def calculate_rsi(self, series, window):
         delta = series.diff()
@@ -20,42 +50,34 @@ class PredictionService:
         rs = gain / loss
         return 100 - (100 / (1 + rs))
 
-    def get_historical_data(self, symbol: str, db_session: Session, timeframe: str = '1d'):
-        historical_data = db_session.query(CryptoHistoricalPrice).filter(
-            CryptoHistoricalPrice.crypto_symbol == symbol,
-            CryptoHistoricalPrice.interval == timeframe
-        ).order_by(CryptoHistoricalPrice.timestamp).all()
+    async def get_historical_data(self, symbol: str, db_session: AsyncSession, timeframe: str = '1d', lookback: int = None):
+        df = await self.history_service.load_frame(symbol, timeframe, db_session, lookback=lookback)
 
-        if not historical_data:
+        if df.empty:
             raise Exception(f"No historical data found for {symbol} with timeframe {timeframe}")
 
-        df = pd.DataFrame([{
-            "timestamp": data.timestamp,
-            "close": float(data.close),
-            "volume": float(data.volume)
-        } for data in historical_data])
-
-        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
         return df
 
+    async def get_latest_timestamp(self, symbol: str, db_session: AsyncSession, timeframe: str = '1d'):
+        return await self.history_service.get_latest_timestamp(symbol, timeframe, db_session)
+
     def add_technical_indicators(self, df):
         df['SMA_10'] = df['close'].rolling(window=10).mean()
         df['EMA_10'] = df['close'].ewm(span=10, adjust=False).mean()
         df['RSI'] = self.calculate_rsi(df['close'], window=14)
         return df
 
+    def track_sentiment(self, symbol: str):
+        # Solo los símbolos con predicciones correctas se refrescan en segundo plano
+        self.external_crypto_service.sentiment_service.track(symbol)
+
     async def get_external_data(self, symbol: str):
-        news_sentiment = await self.external_crypto_service.fetch_news_from_google(symbol)
-        sentiment_mapping = {
-            "neutral": 0,
-            "positive": 1,
-            "negative": -1
-        }
-        numeric_sentiments = [sentiment_mapping.get(item['sentiment'], 0) for item in news_sentiment]
-        average_sentiment = np.mean(numeric_sentiments)
-        return average_sentiment
+        # Sentimiento agregado que SentimentService mantiene al día: normalmente no hay llamada de red
+        return await self.external_crypto_service.sentiment_service.get_news_sentiment(symbol)
 
     def prepare_features(self, df, news_sentiment):
+        import pandas as pd
+
         df['news_sentiment'] = news_sentiment
         for col in ['close', 'volume', 'SMA_10', 'EMA_10', 'RSI', 'news_sentiment']:
             df[col] = pd.to_numeric(df[col], errors='coerce')
@@ -75,44 +97,227 @@ class PredictionService:
         else:
             return "aguantar"
 
-    async def predict_crypto_price(self, symbol: str, timeframe: str, db_session: Session):
+    async def predict_crypto_price(self, symbol: str, timeframe: str, db_session: AsyncSession):
         try:
-            df = pd.DataFrame()
-            if timeframe == "short":
-                df = self.get_historical_data(symbol, db_session, '1d')
-            elif timeframe == "long":
-                df = self.get_historical_data(symbol, db_session, '1w')
-            df = self.add_technical_indicators(df)
+            if timeframe not in TIMEFRAME_INTERVALS:
+                raise Exception("Invalid timeframe specified")
+
+            # Mientras no llegue una vela nueva la predicción no cambia: se reutiliza la cacheada
+            interval = TIMEFRAME_INTERVALS[timeframe]
+            with timed("predict", "latest_timestamp"):
+                latest_timestamp = await self.get_latest_timestamp(symbol, db_session, interval)
+            if latest_timestamp is None:
+                raise Exception(f"No historical data found for {symbol} with timeframe {interval}")
+
+            # El cálculo compartido no usa la sesión de esta petición: puede cerrarse antes de que acabe
+            prediction = await self.prediction_cache.get_or_compute(
+                self._cache_key(symbol, timeframe, latest_timestamp),
+                lambda: self.compute_prediction(symbol, timeframe)
+            )
+            self.track_sentiment(symbol)
+            return prediction
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise Exception(f"Error in prediction: {str(e)}")
+
+    def _cache_key(self, symbol: str, timeframe: str, latest_timestamp: int):
+        return symbol, timeframe, latest_timestamp, MODEL_VERSION
+
+    async def load_indicator_frame(self, symbol: str, db_session: AsyncSession, timeframe: str = '1d'):
+        # Indicadores precalculados por el motor incremental (mismos valores que add_technical_indicators)
+        with timed("predict", "load_history"):
+            df = await self.get_historical_data(symbol, db_session, timeframe)
+        with timed("predict", "indicators"):
+            timestamps = df['timestamp'].values.astype('datetime64[ms]').astype(np.int64)
+            closes = df['close'].values
+            if self.indicator_engine.needs_seed(symbol, timeframe, timestamps, closes):
+                # La siembra recorre todo el histórico vela a vela: fuera del event loop.
+                # Crea un estado nuevo, así no comparte arrays con ingest() mientras tanto
+                await run_in_threadpool(self.indicator_engine.seed, symbol, timeframe, timestamps, closes)
+            series = self.indicator_engine.get_series(symbol, timeframe, timestamps, closes)
+        for column, values in series.items():
+            df[column] = values
+        return df
+
+    def _new_model_entry(self, symbol: str, timeframe: str, model, watermark: int, n_obs: int, updates: int = 0,
+                         fitted_at: float = None):
+        return {
+            "symbol": symbol,
+            "timeframe": timeframe,
+            "version": MODEL_VERSION,
+            "model": model,
+            "watermark": watermark,
+            "n_obs": n_obs,
+            "updates": updates,
+            "fitted_at": fitted_at if fitted_at is not None else time.time(),
+        }
+
+    def _is_reusable(self, entry):
+        return (
+            entry is not None
+            and entry["version"] == MODEL_VERSION
+            and not self.model_registry.needs_full_refit(entry)
+        )
+
+    async def get_short_term_model(self, symbol: str, df, X_train, y_train):
+        # LinearRegression no admite actualización incremental: se reutiliza mientras no haya velas nuevas
+        watermark = int(df['timestamp'].values.astype('datetime64[ms]').astype(np.int64)[-1])
+        entry = self.model_registry.get(symbol, "short")
+        if self._is_reusable(entry) and entry["watermark"] == watermark and entry["n_obs"] == len(df):
+            return entry["model"]
+
+        with timed("predict", "fit"):
+            model = await self.executor.run(fit_short_term_model, X_train, y_train)
+        entry = self._new_model_entry(symbol, "short", model, watermark, len(df))
+        with timed("predict", "persist_model"):
+            await run_in_threadpool(self.model_registry.put, symbol, "short", entry)
+        return model
+
+    async def predict_long_term(self, symbol: str, df):
+        """
+            El modelo ARIMA se ajusta solo con velas cerradas; la última vela (aún abierta) se añade
+            de forma provisional al predecir. Con velas nuevas el estado se extiende sin reestimar.
+            El orden lo elige arima_order_search en segundo plano; si cambia, el modelo se reajusta.
+        """
+        order = self.order_search.get_order(symbol, TIMEFRAME_INTERVALS["long"]) or ARIMA_ORDER
+        closes = df['close'].values
+        timestamps = df['timestamp'].values.astype('datetime64[ms]').astype(np.int64)
+        closed_closes, closed_timestamps = closes[:-1], timestamps[:-1]
+        watermark = int(closed_timestamps[-1])
+
+        entry = self.model_registry.get(symbol, "long")
+        stored_n_obs = None
+        if self._is_reusable(entry) and entry["order"] == order:
+            stored_n_obs = int(np.searchsorted(closed_timestamps, entry["watermark"], side="right"))
+            # Si el histórico anterior a la marca de agua cambió (backfill, huecos), hay que reajustar
+            if stored_n_obs != entry["n_obs"] or closed_timestamps[stored_n_obs - 1] != entry["watermark"]:
+                stored_n_obs = None
+
+        if stored_n_obs is None:
+            with timed("predict", "fit"):
+                model_fit = await self.executor.run(fit_arima, closed_closes, order)
+            entry = self._new_model_entry(symbol, "long", model_fit, watermark, len(closed_closes))
+            entry["order"] = order
+            with timed("predict", "persist_model"):
+                await run_in_threadpool(self.model_registry.put, symbol, "long", entry)
+        elif stored_n_obs < len(closed_closes):
+            with timed("predict", "update"):
+                model_fit = await self.executor.run(update_arima, entry["model"], closed_closes[stored_n_obs:])
+            entry = self._new_model_entry(symbol, "long", model_fit, watermark, len(closed_closes),
+                                          updates=entry["updates"] + 1, fitted_at=entry["fitted_at"])
+            entry["order"] = order
+            with timed("predict", "persist_model"):
+                await run_in_threadpool(self.model_registry.put, symbol, "long", entry)
+
+        with timed("predict", "forecast"):
+            return await self.executor.run(forecast_arima, entry["model"], closes[-1:], FORECAST_STEPS)
+
+    async def compute_prediction(self, symbol: str, timeframe: str):
+        """
+            Cálculo compartido por todas las peticiones que coinciden en la caché (single-flight):
+            abre su propia sesión, porque la de la petición que lo inició puede cerrarse mientras tanto.
+        """
+        async with AsyncSessionLocal() as db_session:
+            df = await self.load_indicator_frame(symbol, db_session, TIMEFRAME_INTERVALS[timeframe])
+        with timed("predict", "sentiment"):
             news_sentiment = await self.get_external_data(symbol)
+        return await self.predict_from_frame(symbol, timeframe, df, news_sentiment)
+
+    async def predict_from_frame(self, symbol: str, timeframe: str, df, news_sentiment):
+        with timed("predict", "features"):
             X, y = self.prepare_features(df, news_sentiment)
 
-            if len(X) < 10:
-                raise Exception("Not enough historical data for prediction")
+        if len(X) < 10:
+            raise Exception("Not enough historical data for prediction")
 
-            if timeframe == "short":
-                split_index = int(len(df) * 0.8)
-                X_train, X_test = X[:split_index], X[split_index:]
-                y_train, y_test = y[:split_index], y[split_index:]
+        if timeframe == "short":
+            split_index = int(len(df) * 0.8)
+            X_train, X_test = X[:split_index], X[split_index:]
+            y_train, y_test = y[:split_index], y[split_index:]
 
-                if len(X_test) == 0:
-                    raise Exception("No data available for prediction. Insufficient historical data.")
+            if len(X_test) == 0:
+                raise Exception("No data available for prediction. Insufficient historical data.")
 
-                model = LinearRegression()
-                model.fit(X_train, y_train)
-                predicted_price = model.predict(X_test[-1].reshape(1, -1))[0]
+            model = await self.get_short_term_model(symbol, df, X_train, y_train)
+            with timed("predict", "forecast"):
+                predicted_price = float(model.predict(X_test[-1].reshape(1, -1))[0])
 
-            elif timeframe == "long":
-                model = ARIMA(df['close'], order=(5, 1, 0))
-                model_fit = model.fit()
-                forecast = model_fit.forecast(steps=30)
-                predicted_price = forecast.mean()
+        elif timeframe == "long":
+            predicted_price = await self.predict_long_term(symbol, df)
 
-            else:
-                raise Exception("Invalid timeframe specified")
+        else:
+            raise Exception("Invalid timeframe specified")
 
-            current_price = df['close'].iloc[-1]
-            action = self.determine_action(current_price, predicted_price)
+        current_price = df['close'].iloc[-1]
+        action = self.determine_action(current_price, predicted_price)
 
-            return {"symbol": symbol, "timeframe": timeframe, "prediction": predicted_price, "action": action}
-        except Exception as e:
-            raise Exception(f"Error in prediction: {str(e)}")
\ No newline at end of file
+        return {"symbol": symbol, "timeframe": timeframe, "prediction": predicted_price, "action": action}
+
+    async def load_batch_frames(self, symbols: list, db_session: AsyncSession, timeframe: str = '1d'):
+        df = await self.history_service.load_many_frame(symbols, timeframe, db_session)
+        df = await run_in_threadpool(add_grouped_technical_indicators, df)
+        return {
+            symbol: group.drop(columns="symbol").reset_index(drop=True)
+            for symbol, group in df.groupby("symbol", sort=False)
+        }
+
+    async def prepare_batch(self, symbols: list, timeframes: list, db_session: AsyncSession):
+        """
+            Carga el histórico de todos los símbolos con una consulta por intervalo y calcula sus indicadores.
+            Todo el acceso a base de datos del lote ocurre aquí, antes de empezar a predecir.
+            :return: Lista de (symbol, timeframe, DataFrame o None si no hay histórico).
+        """
+        frames = {}
+        for timeframe in set(timeframes) & TIMEFRAME_INTERVALS.keys():
+            frames[timeframe] = await self.load_batch_frames(symbols, db_session, TIMEFRAME_INTERVALS[timeframe])
+        return [
+            (symbol, timeframe, frames.get(timeframe, {}).get(symbol))
+            for symbol in symbols
+            for timeframe in timeframes
+        ]
+
+    async def iter_batch_predictions(self, items: list):
+        """
+            Predice cada elemento del lote repartiendo los ajustes en el pool de workers
+            y devuelve los resultados según van terminando. Los errores se devuelven por elemento.
+        """
+        semaphore = asyncio.Semaphore(settings.BATCH_PREDICTION_CONCURRENCY)
+        sentiments = {}
+
+        async def get_sentiment(symbol):
+            # Un único análisis de noticias por símbolo, compartido por sus horizontes
+            if symbol not in sentiments:
+                sentiments[symbol] = asyncio.ensure_future(self.get_external_data(symbol))
+            return await sentiments[symbol]
+
+        async def compute(symbol, timeframe, df):
+            news_sentiment = await get_sentiment(symbol)
+            return await self.predict_from_frame(symbol, timeframe, df.copy(), news_sentiment)
+
+        async def predict_item(symbol, timeframe, df):
+            async with semaphore:
+                try:
+                    if timeframe not in TIMEFRAME_INTERVALS:
+                        raise Exception("Invalid timeframe specified")
+                    if df is None:
+                        raise Exception(
+                            f"No historical data found for {symbol} with timeframe {TIMEFRAME_INTERVALS[timeframe]}"
+                        )
+                    latest_timestamp = df['timestamp'].iloc[-1].value // 1_000_000
+                    prediction = await self.prediction_cache.get_or_compute(
+                        self._cache_key(symbol, timeframe, latest_timestamp),
+                        lambda: compute(symbol, timeframe, df)
+                    )
+                    self.track_sentiment(symbol)
+                    return prediction
+                except Exception as e:
+                    return {"symbol": symbol, "timeframe": timeframe, "error": getattr(e, "detail", str(e))}
+
+        tasks = [asyncio.ensure_future(predict_item(*item)) for item in items]
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                yield await next_result
+        finally:
+            for task in tasks:
+                task.cancel()
@@ -1,3 +1,5 @@
+from typing import List, Optional
+
 from pydantic import BaseModel
 
 class CryptoBase(BaseModel):
@@ -8,4 +10,9 @@ class CryptoCreate(CryptoBase):
 
 class CryptoUpdate(BaseModel):
     name: str = None
-    price: float = None
\ No newline at end of file
+    price: float = None
+
+class BatchPredictionRequest(BaseModel):
+    symbols: List[str]
+    timeframes: List[str] = ["short"]
+    stream: Optional[bool] = None  # Por defecto se usa NDJSON a partir de BATCH_STREAM_THRESHOLD resultados
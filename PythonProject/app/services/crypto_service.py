@@ -1,84 +1,220 @@
+import asyncio
+import time
 from datetime import datetime
 
-import httpx
-from sqlalchemy.orm import Session
+from sqlalchemy import delete
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import settings
+from app.database.partitions import partition_manager
 from app.models.crypto import Crypto
 from app.models.crypto_historical_price import CryptoHistoricalPrice
+from app.predictor.indicators import indicator_engine
+from app.services.history_service import HistoryService
+from app.services.http_client import get_http_client
+from app.services.rate_limiter import binance_weight_limiter, klines_request_weight
+from app.services.rollup_service import RollupService
+from app.utils.metrics import timed
+
+# Duración de cada intervalo de Binance en milisegundos ('1M' se aproxima a 31 días)
+INTERVAL_MS = {
+    "1m": 60_000,
+    "3m": 3 * 60_000,
+    "5m": 5 * 60_000,
+    "15m": 15 * 60_000,
+    "30m": 30 * 60_000,
+    "1h": 3_600_000,
+    "2h": 2 * 3_600_000,
+    "4h": 4 * 3_600_000,
+    "6h": 6 * 3_600_000,
+    "8h": 8 * 3_600_000,
+    "12h": 12 * 3_600_000,
+    "1d": 86_400_000,
+    "3d": 3 * 86_400_000,
+    "1w": 7 * 86_400_000,
+    "1M": 31 * 86_400_000,
+}
+
+KLINES_PAGE_LIMIT = 1000
 
 class CryptoService:
     def __init__(self):
-        self.base_url = "https://api.binance.com/api/v3"
+        self.history_service = HistoryService()
+        self.rollup_service = RollupService()
+
+    @property
+    def client(self):
+        return get_http_client("binance")
 
     async def get_crypto_price_from_api(self, symbol: str):
-        url = f"{self.base_url}/ticker/price?symbol={symbol}USDT"
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url)
-            if response.status_code == 200:
-                data = response.json()
-                return {
-                    "symbol": symbol,
-                    "price": float(data["price"])
-                }
-            else:
-                return None
+        response = await self.client.get("/ticker/price", params={"symbol": f"{symbol}USDT"})
+        if response.status_code == 200:
+            data = response.json()
+            return {
+                "symbol": symbol,
+                "price": float(data["price"])
+            }
+        else:
+            return None
 
     async def get_crypto_info_from_api(self, symbol: str):
-        url = f"{self.base_url}/ticker/24hr?symbol={symbol}USDT"
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url)
-            if response.status_code == 200:
-                data = response.json()
-                return {
-                    "name": symbol,
-                    "price": float(data["lastPrice"]),
-                    "last_updated": datetime.utcnow()
+        response = await self.client.get("/ticker/24hr", params={"symbol": f"{symbol}USDT"})
+        if response.status_code == 200:
+            data = response.json()
+            return {
+                "name": symbol,
+                "price": float(data["lastPrice"]),
+                "last_updated": datetime.utcnow()
+            }
+        return None
+
+    async def get_historical_data_service(self, symbol: str, interval: str, limit: int = 1000,
+                                          start_time: int = None, end_time: int = None):
+        params = {"symbol": symbol, "interval": interval, "limit": limit}
+        if start_time is not None:
+            params["startTime"] = start_time
+        if end_time is not None:
+            params["endTime"] = end_time
+        # Espera por el presupuesto de peso de Binance (aparte de la duración de la propia petición)
+        with timed("historical", "rate_limit_wait"):
+            weight = klines_request_weight(limit)
+            await binance_weight_limiter.acquire(weight)
+        # El cliente HTTP cobra los reintentos con el mismo peso y sincroniza X-MBX-USED-WEIGHT-1M
+        response = await self.client.get("/klines", params=params, extensions={"request_weight": weight})
+        if response.status_code == 200:
+            data = response.json()
+            return [
+                {
+                    "timestamp": entry[0],
+                    "open": float(entry[1]),
+                    "high": float(entry[2]),
+                    "low": float(entry[3]),
+                    "close": float(entry[4]),
+                    "volume": float(entry[5]),
                 }
-            return None
+                for entry in data
+            ]
+        else:
+            raise Exception(f"Error fetching historical data: {response.text}")
+
+    async def upsert_historical_data(self, symbol: str, interval: str, historical_data: list, db: AsyncSession):
+        """
+            Inserta las velas en una única sentencia multi-fila.
+            Las velas ya guardadas solo se actualizan, así la última vela (aún abierta) queda al día.
+            :return: Número de velas enviadas a la base de datos.
+        """
+        if not historical_data:
+            return 0
+
+        timestamps = [data["timestamp"] for data in historical_data]
+        await partition_manager.ensure(interval, min(timestamps), max(timestamps))
+        rows = [{**data, "crypto_symbol": symbol, "interval": interval} for data in historical_data]
+        stmt = insert(CryptoHistoricalPrice).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["crypto_symbol", "interval", "timestamp"],
+            set_={
+                "open": stmt.excluded.open,
+                "high": stmt.excluded.high,
+                "low": stmt.excluded.low,
+                "close": stmt.excluded.close,
+                "volume": stmt.excluded.volume,
+            },
+        )
+        await db.execute(stmt)
+        return len(rows)
+
+    async def store_historical_data(self, symbol: str, interval: str, historical_data: list, db: AsyncSession):
+        """
+            Guarda las velas, recalcula los intervalos derivados de ellas (p. ej. 1d -> 1w) y
+            actualiza los indicadores de todos los intervalos afectados.
+            :return: Número de velas del intervalo pedido guardadas.
+        """
+        with timed("historical", "upsert"):
+            saved = await self.upsert_historical_data(symbol, interval, historical_data, db)
+        rolled = {}
+        if saved:
+            timestamps = [data["timestamp"] for data in historical_data]
+            with timed("historical", "rollup"):
+                rolled = await self.rollup_service.rollup(symbol, interval, min(timestamps), max(timestamps), db)
+        with timed("historical", "commit"):
+            await db.commit()
+        with timed("historical", "indicators"):
+            indicator_engine.ingest(symbol, interval, historical_data)
+            for rolled_interval, candles in rolled.items():
+                indicator_engine.ingest(symbol, rolled_interval, candles)
+        return saved
+
+    async def save_historical_data_to_db(self, symbol: str, interval: str, db: AsyncSession = None):
+        # Solo se piden a Binance las velas a partir de la última guardada
+        with timed("historical", "latest_timestamp"):
+            latest_timestamp = await self.history_service.get_latest_timestamp(symbol, interval, db)
+        if latest_timestamp is None:
+            # Primera descarga: histórico completo, así los intervalos derivados tienen toda su profundidad
+            return await self.backfill_historical_data(symbol, interval, settings.CANDLE_HISTORY_START_MS, db=db)
+        with timed("historical", "download"):
+            historical_data = await self.get_historical_data_service(symbol, interval, limit=1000, start_time=latest_timestamp)
+        return await self.store_historical_data(symbol, interval, historical_data, db)
+
+    async def backfill_historical_data(self, symbol: str, interval: str, start_time: int, end_time: int = None,
+                                       db: AsyncSession = None, concurrency: int = None):
+        """
+            Descarga el histórico completo entre start_time y end_time recorriendo ventanas de 1000 velas.
+            `concurrency` descargas piden las páginas en paralelo (también limitadas por el presupuesto de peso
+            de Binance) y las dejan en una cola acotada; un único consumidor guarda cada página en orden de llegada.
+            Si el guardado se retrasa, las descargas esperan: en memoria nunca hay más de 2 * concurrency páginas.
+            :return: Número de velas guardadas.
+        """
+        if interval not in INTERVAL_MS:
+            raise Exception(f"Unsupported interval: {interval}")
+        if end_time is None:
+            end_time = int(time.time() * 1000)
+
+        page_span = KLINES_PAGE_LIMIT * INTERVAL_MS[interval]
+        window_starts = range(start_time, end_time + 1, page_span)
+        pending = iter(window_starts)
+        concurrency = min(concurrency or settings.BINANCE_BACKFILL_CONCURRENCY, len(window_starts))
+        pages = asyncio.Queue(maxsize=concurrency)
+
+        async def download():
+            # Cada descarga toma la siguiente ventana libre: las páginas llegan casi en orden
+            try:
+                for window_start in pending:
+                    with timed("historical", "download"):
+                        page = await self.get_historical_data_service(
+                            symbol, interval, limit=KLINES_PAGE_LIMIT, start_time=window_start,
+                            end_time=min(window_start + page_span - 1, end_time),
+                        )
+                    await pages.put(page)
+            except Exception as e:
+                # El consumidor la relanza: sin esto esperaría para siempre una página que no llega
+                await pages.put(e)
+
+        workers = [asyncio.create_task(download()) for _ in range(concurrency)]
+        saved = 0
+        try:
+            for _ in window_starts:
+                page = await pages.get()
+                if isinstance(page, Exception):
+                    raise page
+                saved += await self.store_historical_data(symbol, interval, page, db)
+        finally:
+            for worker in workers:
+                worker.cancel()
+        return saved
 
-    async def get_historical_data_service(self, symbol: str, interval: str, limit: int = 1000):
-        url = f"{self.base_url}/klines?symbol={symbol}&interval={interval}&limit={limit}"
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url)
-            if response.status_code == 200:
-                data = response.json()
-                return [
-                    {
-                        "timestamp": entry[0],
-                        "open": float(entry[1]),
-                        "high": float(entry[2]),
-                        "low": float(entry[3]),
-                        "close": float(entry[4]),
-                        "volume": float(entry[5]),
-                    }
-                    for entry in data
-                ]
-            else:
-                raise Exception(f"Error fetching historical data: {response.text}")
-
-    async def save_historical_data_to_db(self, symbol: str, interval: str, db: Session = None):
-        historical_data = await self.get_historical_data_service(symbol, interval, limit=1000)
-        for data in historical_data:
-            exists = db.query(CryptoHistoricalPrice).filter_by(
-                crypto_symbol=symbol,
-                timestamp=data["timestamp"],
-                interval=interval
-            ).first()
-            if not exists:
-                db_record = CryptoHistoricalPrice(
-                    crypto_symbol=symbol,
-                    timestamp=data["timestamp"],
-                    open=data["open"],
-                    high=data["high"],
-                    low=data["low"],
-                    close=data["close"],
-                    volume=data["volume"],
-                    interval=interval,
-                )
-                db.add(db_record)
-        db.commit()
-
-    async def delete_crypto_and_historical_data(self, symbol: str, db: Session = None):
-        db.query(CryptoHistoricalPrice).filter_by(crypto_symbol=symbol).delete()
-        db.query(Crypto).filter_by(symbol=symbol).delete()
-        db.commit()
\ No newline at end of file
+    async def delete_crypto_and_historical_data(self, symbol: str, db: AsyncSession = None):
+        """
+            Borra el histórico partición a partición (cada DELETE solo recorre una partición)
+            con un commit por lote, en lugar de un único DELETE sobre toda la tabla.
+        """
+        for partition in await partition_manager.list_partitions(db):
+            await db.execute(delete(CryptoHistoricalPrice).where(
+                CryptoHistoricalPrice.crypto_symbol == symbol,
+                CryptoHistoricalPrice.interval == partition.interval,
+                CryptoHistoricalPrice.timestamp >= partition.lower,
+                CryptoHistoricalPrice.timestamp < partition.upper,
+            ))
+            await db.commit()
+        await db.execute(delete(Crypto).where(Crypto.symbol == symbol))
+        await db.commit()
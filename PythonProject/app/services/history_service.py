@@ -0,0 +1,95 @@
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.crypto_historical_price import CryptoHistoricalPrice
+
+HISTORY_COLUMNS = ("timestamp", "close", "volume")
+
+
+class HistoryService:
+    """
+        Lectura columnar del histórico de velas: selecciona solo las columnas pedidas y las vuelca
+        directamente en arrays de NumPy, sin crear objetos del ORM.
+    """
+
+    async def get_latest_timestamp(self, symbol: str, interval: str, db: AsyncSession):
+        result = await db.execute(
+            select(func.max(CryptoHistoricalPrice.timestamp)).where(
+                CryptoHistoricalPrice.crypto_symbol == symbol,
+                CryptoHistoricalPrice.interval == interval
+            )
+        )
+        return result.scalar()
+
+    async def get_symbols(self, interval: str, db: AsyncSession):
+        result = await db.execute(
+            select(CryptoHistoricalPrice.crypto_symbol).where(CryptoHistoricalPrice.interval == interval)
+            .distinct().order_by(CryptoHistoricalPrice.crypto_symbol)
+        )
+        return list(result.scalars())
+
+    async def load_arrays(self, symbol: str, interval: str, db: AsyncSession, columns=HISTORY_COLUMNS,
+                    lookback: int = None, since: int = None):
+        """
+            :param columns: Columnas de CryptoHistoricalPrice a leer.
+            :param lookback: Si se indica, solo las últimas `lookback` velas.
+            :param since: Si se indica, solo velas con timestamp >= since (ms).
+            :return: Diccionario columna -> array, ordenado por timestamp ascendente.
+        """
+        stmt = select(*[getattr(CryptoHistoricalPrice, column) for column in columns]).where(
+            CryptoHistoricalPrice.crypto_symbol == symbol,
+            CryptoHistoricalPrice.interval == interval
+        )
+        if since is not None:
+            stmt = stmt.where(CryptoHistoricalPrice.timestamp >= since)
+        if lookback:
+            stmt = stmt.order_by(CryptoHistoricalPrice.timestamp.desc()).limit(lookback)
+        else:
+            stmt = stmt.order_by(CryptoHistoricalPrice.timestamp)
+
+        # Cursor del lado del servidor: las filas llegan por bloques y se convierten a arrays bloque a bloque
+        result = await db.stream(stmt)
+        blocks = [np.array(block, dtype=np.float64) async for block in result.partitions(settings.HISTORY_FETCH_SIZE)]
+        data = np.concatenate(blocks) if blocks else np.empty((0, len(columns)))
+        if lookback:
+            data = data[::-1]
+
+        arrays = {column: data[:, i] for i, column in enumerate(columns)}
+        if "timestamp" in arrays:
+            arrays["timestamp"] = arrays["timestamp"].astype(np.int64)
+        return arrays
+
+    async def load_many_frame(self, symbols: list, interval: str, db: AsyncSession, columns=HISTORY_COLUMNS):
+        """
+            Histórico de varios símbolos en una sola consulta.
+            :return: DataFrame con una columna 'symbol', ordenado por símbolo y timestamp.
+        """
+        stmt = select(
+            CryptoHistoricalPrice.crypto_symbol,
+            *[getattr(CryptoHistoricalPrice, column) for column in columns]
+        ).where(
+            CryptoHistoricalPrice.crypto_symbol.in_(symbols),
+            CryptoHistoricalPrice.interval == interval
+        ).order_by(CryptoHistoricalPrice.crypto_symbol, CryptoHistoricalPrice.timestamp)
+
+        import pandas as pd
+
+        result = await db.stream(stmt)
+        frame_columns = ["symbol", *columns]
+        blocks = [pd.DataFrame.from_records(block, columns=frame_columns)
+                  async for block in result.partitions(settings.HISTORY_FETCH_SIZE)]
+        df = pd.concat(blocks, ignore_index=True) if blocks else pd.DataFrame(columns=frame_columns)
+        if "timestamp" in df:
+            df["timestamp"] = pd.to_datetime(df["timestamp"].astype("int64"), unit="ms")
+        return df
+
+    async def load_frame(self, symbol: str, interval: str, db: AsyncSession, columns=HISTORY_COLUMNS,
+                   lookback: int = None, since: int = None):
+        import pandas as pd
+
+        df = pd.DataFrame(await self.load_arrays(symbol, interval, db, columns, lookback, since))
+        if "timestamp" in df:
+            df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms")
+        return df
@@ -0,0 +1,143 @@
+import asyncio
+import random
+import time
+
+import httpx
+
+from app.config import settings
+from app.services.rate_limiter import binance_weight_limiter
+from app.utils.metrics import UPSTREAM_DURATION, UPSTREAM_ERRORS, UPSTREAM_RETRIES
+
+# 418 (IP bloqueada por Binance) no se reintenta a propósito
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Un cliente por API externa; HTTP/2 solo donde el servidor lo soporta.
+# Con weight_limiter, cada reintento se cobra al presupuesto de peso (las peticiones indican su peso
+# en extensions={"request_weight": ...}; el primer intento lo cobra quien hace la petición)
+UPSTREAMS = {
+    "binance": {"base_url": settings.BINANCE_BASE_URL, "http2": True, "weight_limiter": binance_weight_limiter},
+    "google_news": {"base_url": settings.GOOGLE_NEWS_BASE_URL, "http2": True},
+    "reddit": {"base_url": settings.REDDIT_BASE_URL, "http2": False},
+}
+
+_clients = {}
+
+
+def _http2_available():
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class RetryTransport(httpx.AsyncBaseTransport):
+    """
+        Reintenta errores de conexión y respuestas 429/5xx con backoff exponencial y jitter completo.
+        Si la respuesta trae Retry-After se espera ese tiempo completo; si supera `retry_after_max` no se
+        reintenta y se devuelve la respuesta (reintentar antes en Binance acaba en un 418).
+        Cada intento, reintento y fallo definitivo queda en las métricas de la API externa (`upstream`).
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, max_retries: int,
+                 backoff_base: float, backoff_max: float, upstream: str = "unknown",
+                 retry_after_max: float = 60.0, weight_limiter=None):
+        self.transport = transport
+        self.upstream = upstream
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_after_max = retry_after_max
+        self.weight_limiter = weight_limiter
+
+    def _backoff(self, attempt: int):
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _retry_after(self, response: httpx.Response):
+        try:
+            return float(response.headers["Retry-After"])
+        except (KeyError, ValueError):
+            return None
+
+    async def _charge_retry(self, request: httpx.Request):
+        weight = request.extensions.get("request_weight")
+        if self.weight_limiter is not None and weight:
+            await self.weight_limiter.acquire(weight)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        attempt = 0
+        while True:
+            if attempt:
+                await self._charge_retry(request)
+            start = time.perf_counter()
+            try:
+                response = await self.transport.handle_async_request(request)
+            except httpx.TransportError as e:
+                UPSTREAM_DURATION.labels(self.upstream, "error").observe(time.perf_counter() - start)
+                if attempt >= self.max_retries:
+                    UPSTREAM_ERRORS.labels(self.upstream, type(e).__name__).inc()
+                    raise
+                UPSTREAM_RETRIES.labels(self.upstream, type(e).__name__).inc()
+                await asyncio.sleep(self._backoff(attempt))
+                attempt += 1
+                continue
+
+            UPSTREAM_DURATION.labels(self.upstream, str(response.status_code)).observe(time.perf_counter() - start)
+            if self.weight_limiter is not None:
+                self.weight_limiter.update_used_weight(response.headers.get("X-MBX-USED-WEIGHT-1M"))
+            if response.status_code not in RETRY_STATUS_CODES:
+                return response
+            delay = self._retry_after(response)
+            if attempt >= self.max_retries or (delay is not None and delay > self.retry_after_max):
+                UPSTREAM_ERRORS.labels(self.upstream, str(response.status_code)).inc()
+                return response
+
+            UPSTREAM_RETRIES.labels(self.upstream, str(response.status_code)).inc()
+            await response.aclose()
+            await asyncio.sleep(delay if delay is not None else self._backoff(attempt))
+            attempt += 1
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+def create_http_client(upstream: str) -> httpx.AsyncClient:
+    config = UPSTREAMS[upstream]
+    limits = httpx.Limits(
+        max_connections=settings.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY_SECONDS,
+    )
+    transport = httpx.AsyncHTTPTransport(http2=config["http2"] and _http2_available(), limits=limits)
+    return httpx.AsyncClient(
+        base_url=config["base_url"],
+        timeout=httpx.Timeout(settings.HTTP_TIMEOUT_SECONDS, connect=settings.HTTP_CONNECT_TIMEOUT_SECONDS),
+        transport=RetryTransport(
+            transport,
+            max_retries=settings.HTTP_MAX_RETRIES,
+            backoff_base=settings.HTTP_BACKOFF_BASE_SECONDS,
+            backoff_max=settings.HTTP_BACKOFF_MAX_SECONDS,
+            upstream=upstream,
+            retry_after_max=settings.HTTP_RETRY_AFTER_MAX_SECONDS,
+            weight_limiter=config.get("weight_limiter"),
+        ),
+    )
+
+
+def get_http_client(upstream: str) -> httpx.AsyncClient:
+    # Fuera de la app (scripts) el cliente se crea bajo demanda
+    if upstream not in _clients:
+        _clients[upstream] = create_http_client(upstream)
+    return _clients[upstream]
+
+
+def open_http_clients():
+    for upstream in UPSTREAMS:
+        get_http_client(upstream)
+
+
+async def close_http_clients():
+    clients = list(_clients.values())
+    _clients.clear()
+    for client in clients:
+        await client.aclose()
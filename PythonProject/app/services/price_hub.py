@@ -0,0 +1,148 @@
+import asyncio
+import json
+import logging
+import time
+from contextlib import contextmanager
+
+from app.config import settings
+from app.services.http_client import get_http_client
+from app.services.rate_limiter import binance_weight_limiter
+
+logger = logging.getLogger(__name__)
+
+# Peso de /api/v3/ticker/price sin símbolo (todos los pares)
+TICKER_PRICE_ALL_WEIGHT = 4
+
+
+class PriceHub:
+    """
+        Mantiene el último precio de cada símbolo a partir de una única fuente de Binance
+        (stream de WebSocket o, como alternativa, sondeo del ticker de todos los pares)
+        y lo reparte a los clientes suscritos.
+    """
+
+    def __init__(self, mode: str = None, stream_url: str = None, poll_interval: float = None,
+                 quote_asset: str = "USDT"):
+        self.mode = mode or settings.PRICE_HUB_MODE
+        self.stream_url = stream_url or settings.BINANCE_STREAM_URL
+        self.poll_interval = poll_interval or settings.PRICE_HUB_POLL_INTERVAL_SECONDS
+        self.quote_asset = quote_asset
+        # Origen efectivo ("stream" o "poll"), resuelto una sola vez al arrancar; None si el hub no está en marcha
+        self.source = None
+        self.prices = {}
+        self._subscribers = {}
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self.source = None
+
+    def _use_stream(self):
+        if self.mode == "poll":
+            return False
+        try:
+            import websockets  # noqa: F401
+            return True
+        except ImportError:
+            if self.mode == "stream":
+                logger.warning("websockets no está instalado: el hub de precios usará sondeo REST")
+            return False
+
+    async def _run(self):
+        use_stream = self._use_stream()
+        self.source = "stream" if use_stream else "poll"
+        backoff = 1
+        while True:
+            try:
+                if use_stream:
+                    await self._consume_stream()
+                else:
+                    await self._poll()
+                backoff = 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Error en la fuente de precios, reintentando en {backoff}s: {e}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 60)
+
+    async def _consume_stream(self):
+        import websockets
+
+        async with websockets.connect(self.stream_url) as websocket:
+            async for message in websocket:
+                for ticker in json.loads(message):
+                    self.publish_pair(ticker["s"], float(ticker["c"]), ticker.get("E"))
+
+    async def _poll(self):
+        while True:
+            await binance_weight_limiter.acquire(TICKER_PRICE_ALL_WEIGHT)
+            response = await get_http_client("binance").get(
+                "/ticker/price", extensions={"request_weight": TICKER_PRICE_ALL_WEIGHT}
+            )
+            response.raise_for_status()
+            for ticker in response.json():
+                self.publish_pair(ticker["symbol"], float(ticker["price"]))
+            await asyncio.sleep(self.poll_interval)
+
+    def publish_pair(self, pair: str, price: float, event_time: int = None):
+        if pair.endswith(self.quote_asset):
+            self.publish(pair[:-len(self.quote_asset)], price, event_time)
+
+    def publish(self, symbol: str, price: float, event_time: int = None):
+        now = time.time()
+        current = self.prices.get(symbol)
+        if current is not None and current["price"] == price:
+            current["received_at"] = now
+            return
+
+        update = {
+            "symbol": symbol,
+            "price": price,
+            "event_time": event_time if event_time is not None else int(now * 1000),
+            "received_at": now,
+        }
+        self.prices[symbol] = update
+        for queue in self._subscribers.get(symbol, ()):
+            if queue.full():
+                # Cliente lento: se descarta el precio más antiguo, solo importa el último
+                queue.get_nowait()
+            queue.put_nowait(update)
+
+    def get_price(self, symbol: str):
+        current = self.prices.get(symbol)
+        if current is None or time.time() - current["received_at"] > settings.PRICE_HUB_MAX_AGE_SECONDS:
+            return None
+        return {"symbol": symbol, "price": current["price"]}
+
+    @contextmanager
+    def subscribe(self, symbol: str):
+        queue = asyncio.Queue(maxsize=settings.PRICE_HUB_SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.setdefault(symbol, set()).add(queue)
+        try:
+            yield queue
+        finally:
+            subscribers = self._subscribers.get(symbol)
+            subscribers.discard(queue)
+            if not subscribers:
+                del self._subscribers[symbol]
+
+    def stats(self):
+        return {
+            "mode": self.source,
+            "symbols": len(self.prices),
+            "subscribers": sum(len(queues) for queues in self._subscribers.values()),
+        }
+
+
+price_hub = PriceHub()
@@ -0,0 +1,66 @@
+import asyncio
+import time
+
+from app.config import settings
+
+
+def klines_request_weight(limit: int):
+    # Pesos de /api/v3/klines según la documentación de Binance
+    if limit < 100:
+        return 1
+    if limit < 500:
+        return 2
+    if limit <= 1000:
+        return 5
+    return 10
+
+
+class RequestWeightLimiter:
+    """
+        Presupuesto de peso de peticiones por minuto, igual que la ventana de Binance
+        (se reinicia al comienzo de cada minuto).
+        Si el presupuesto del minuto actual se agota, las peticiones esperan al siguiente.
+    """
+
+    def __init__(self, weight_per_minute: int):
+        self.weight_per_minute = weight_per_minute
+        self._window = self._current_window()
+        self._used = 0
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    def _current_window():
+        return int(time.time() // 60)
+
+    def _roll_window(self):
+        window = self._current_window()
+        if window != self._window:
+            self._window = window
+            self._used = 0
+
+    async def acquire(self, weight: int):
+        weight = min(weight, self.weight_per_minute)
+        async with self._lock:
+            self._roll_window()
+            while self._used + weight > self.weight_per_minute:
+                await asyncio.sleep(60 - time.time() % 60)
+                self._roll_window()
+            self._used += weight
+
+    def update_used_weight(self, used_weight):
+        """
+            Sincroniza el contador con la cabecera X-MBX-USED-WEIGHT-1M devuelta por Binance,
+            que también cuenta peticiones hechas por otros procesos con la misma IP.
+        """
+        if used_weight is None:
+            return
+        self._roll_window()
+        self._used = max(self._used, int(used_weight))
+
+    def stats(self):
+        self._roll_window()
+        return {"used_weight": self._used, "weight_per_minute": self.weight_per_minute}
+
+
+# Compartido por todo el proceso: el límite de Binance es por IP
+binance_weight_limiter = RequestWeightLimiter(settings.BINANCE_WEIGHT_LIMIT_PER_MINUTE)
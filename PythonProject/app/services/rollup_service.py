@@ -0,0 +1,80 @@
+from sqlalchemy import func, literal, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by, array_agg, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.partitions import partition_manager
+from app.models.crypto_historical_price import CryptoHistoricalPrice
+
+# Intervalo origen -> (intervalo derivado, duración del bucket en ms, desfase del bucket en ms).
+# Las velas semanales de Binance abren el lunes a las 00:00 UTC y el 1/1/1970 fue jueves: desfase de 4 días.
+ROLLUPS = {
+    "1h": ("1d", 86_400_000, 0),
+    "1d": ("1w", 7 * 86_400_000, 4 * 86_400_000),
+}
+
+
+def bucket_start(timestamp: int, width: int, offset: int = 0):
+    return timestamp - (timestamp - offset) % width
+
+
+class RollupService:
+    """
+        Deriva los intervalos más largos (1h -> 1d -> 1w) a partir del más fino guardado, en lugar de
+        descargarlos por separado. Cada llamada solo recalcula los buckets que tocan las velas nuevas.
+    """
+
+    async def rollup(self, symbol: str, interval: str, first_timestamp: int, last_timestamp: int, db: AsyncSession):
+        """
+            Recalcula, en cascada, los buckets de los intervalos derivados de `interval` que contienen
+            las velas entre first_timestamp y last_timestamp. No hace commit.
+            :return: Diccionario intervalo derivado -> velas escritas (para alimentar los indicadores).
+        """
+        if interval not in ROLLUPS:
+            return {}
+        target, width, offset = ROLLUPS[interval]
+        first_bucket = bucket_start(first_timestamp, width, offset)
+        last_bucket = bucket_start(last_timestamp, width, offset)
+        await partition_manager.ensure(target, first_bucket, last_bucket)
+
+        source = CryptoHistoricalPrice
+        bucket = (source.timestamp - (source.timestamp - offset) % width).label("bucket")
+        candles = select(source.timestamp, source.open, source.high, source.low, source.close, source.volume, bucket).where(
+            source.crypto_symbol == symbol,
+            source.interval == interval,
+            source.timestamp >= first_bucket,
+            source.timestamp < last_bucket + width,
+        ).subquery()
+        aggregated = select(
+            literal(symbol, source.crypto_symbol.type),
+            literal(target, source.interval.type),
+            candles.c.bucket,
+            array_agg(aggregate_order_by(candles.c.open, candles.c.timestamp.asc()))[1],
+            func.max(candles.c.high),
+            func.min(candles.c.low),
+            array_agg(aggregate_order_by(candles.c.close, candles.c.timestamp.desc()))[1],
+            func.sum(candles.c.volume),
+        ).group_by(candles.c.bucket).having(
+            # Un bucket sin su primera vela (histórico que empieza a mitad de semana) daría una apertura falsa
+            func.min(candles.c.timestamp) == candles.c.bucket
+        )
+
+        stmt = insert(source).from_select(
+            ["crypto_symbol", "interval", "timestamp", "open", "high", "low", "close", "volume"], aggregated
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["crypto_symbol", "interval", "timestamp"],
+            set_={
+                "open": stmt.excluded.open,
+                "high": stmt.excluded.high,
+                "low": stmt.excluded.low,
+                "close": stmt.excluded.close,
+                "volume": stmt.excluded.volume,
+            },
+        ).returning(source.timestamp, source.open, source.high, source.low, source.close, source.volume)
+
+        result = await db.execute(stmt)
+        written = [dict(row) for row in result.mappings()]
+        rolled = {target: written}
+        if written:
+            rolled.update(await self.rollup(symbol, target, first_bucket, last_bucket, db))
+        return rolled
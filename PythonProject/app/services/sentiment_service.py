@@ -0,0 +1,247 @@
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from xml.etree import ElementTree as ET
+
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.services.http_client import get_http_client
+from app.utils.cache import AsyncTTLCache
+
+logger = logging.getLogger(__name__)
+
+SENTIMENT_MAPPING = {
+    "neutral": 0,
+    "positive": 1,
+    "negative": -1
+}
+
+
+def sentiment_label(compound: float):
+    return "positive" if compound > 0 else "negative" if compound < 0 else "neutral"
+
+
+def _text_key(text: str):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class SentimentService:
+    """
+        Descarga y puntúa con VADER las noticias y comentarios de cada símbolo.
+        - Los feeds descargados se cachean por símbolo con TTL.
+        - Las puntuaciones se memorizan por hash del texto y los textos nuevos se puntúan por lotes fuera del event loop.
+        - Se mantiene un sentimiento agregado por símbolo que se refresca en segundo plano.
+    """
+
+    def __init__(self):
+        self._analyzer = None
+        self._analyzer_lock = threading.Lock()
+        self.feed_cache = AsyncTTLCache(settings.SENTIMENT_FEED_CACHE_MAX_ENTRIES, settings.SENTIMENT_FEED_TTL_SECONDS)
+        self._scores = OrderedDict()
+        self.score_hits = 0
+        self.score_misses = 0
+        # Por símbolo pedido: acotados como _tracked_symbols, se descartan los menos recientes
+        self._news_windows = OrderedDict()
+        self._aggregates = OrderedDict()
+        self._tracked_symbols = OrderedDict()
+        self._task = None
+
+    @property
+    def analyzer(self):
+        # VADER carga su léxico al crearse: se construye con el primer texto a puntuar (o en el calentamiento)
+        if self._analyzer is None:
+            with self._analyzer_lock:
+                if self._analyzer is None:
+                    from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+                    self._analyzer = SentimentIntensityAnalyzer()
+        return self._analyzer
+
+    def _score_uncached(self, texts: list):
+        return [self.analyzer.polarity_scores(text)["compound"] for text in texts]
+
+    async def score_texts(self, texts: list):
+        """
+            :return: Puntuación compuesta de VADER para cada texto, en el mismo orden.
+        """
+        keys = [_text_key(text) for text in texts]
+        known = {}
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key in known or key in missing:
+                continue
+            score = self._scores.get(key)
+            if score is None:
+                missing[key] = text
+            else:
+                self._scores.move_to_end(key)
+                known[key] = score
+
+        self.score_misses += len(missing)
+        self.score_hits += len(texts) - len(missing)
+        if missing:
+            scores = await run_in_threadpool(self._score_uncached, list(missing.values()))
+            for key, score in zip(missing, scores):
+                known[key] = score
+                self._scores[key] = score
+            while len(self._scores) > settings.SENTIMENT_SCORE_CACHE_SIZE:
+                self._scores.popitem(last=False)
+
+        return [known[key] for key in keys]
+
+    async def _download_news(self, symbol: str, max_results: int):
+        query = f"{symbol} cryptocurrency"
+        params = {"q": query, "hl": "en-US", "gl": "US", "ceid": "US:en"}
+
+        response = await get_http_client("google_news").get("/rss/search", params=params)
+        if response.status_code != 200:
+            raise Exception(f"Error al obtener noticias: {response.text}")
+
+        root = ET.fromstring(response.text)
+        items = root.findall(".//item")[:max_results]
+        titles = [item.find("title").text for item in items]
+        scores = await self.score_texts(titles)
+
+        news = [
+            {
+                "title": title,
+                "published_at": item.find("pubDate").text,
+                "url": item.find("link").text,
+                "sentiment": sentiment_label(score)
+            }
+            for item, title, score in zip(items, titles, scores)
+        ]
+        self._update_aggregate(symbol, news)
+        return news
+
+    async def _download_reddit(self, symbol: str, max_results: int):
+        params = {"q": symbol, "size": max_results, "sort": "desc"}
+        response = await get_http_client("reddit").get("/reddit/search/comment/", params=params)
+        if response.status_code != 200:
+            raise Exception(f"Error al obtener datos de Reddit: {response.text}")
+        data = response.json()["data"]
+        scores = await self.score_texts([comment["body"] for comment in data])
+
+        return [
+            {
+                "comment": comment["body"],
+                "created_at": comment["created_utc"],
+                "sentiment": sentiment_label(score)
+            }
+            for comment, score in zip(data, scores)
+        ]
+
+    async def get_news(self, symbol: str, max_results: int = 10):
+        return await self.feed_cache.get_or_compute(
+            ("news", symbol, max_results),
+            lambda: self._download_news(symbol, max_results)
+        )
+
+    async def get_reddit_comments(self, symbol: str, max_results: int = 10):
+        return await self.feed_cache.get_or_compute(
+            ("reddit", symbol, max_results),
+            lambda: self._download_reddit(symbol, max_results)
+        )
+
+    def _update_aggregate(self, symbol: str, news: list):
+        # Ventana de los titulares más recientes sin repetidos (el feed devuelve los mismos en cada descarga)
+        window = self._news_windows.setdefault(symbol, deque(maxlen=settings.SENTIMENT_WINDOW_ITEMS))
+        self._news_windows.move_to_end(symbol)
+        seen = {title for title, _ in window}
+        for item in reversed(news):
+            if item["title"] not in seen:
+                window.append((item["title"], SENTIMENT_MAPPING.get(item["sentiment"], 0)))
+                seen.add(item["title"])
+
+        values = [value for _, value in window]
+        aggregate = self._aggregates[symbol] = {
+            "score": sum(values) / len(values) if values else 0.0,
+            "items": len(values),
+            "updated_at": time.time(),
+        }
+        self._aggregates.move_to_end(symbol)
+        while len(self._aggregates) > settings.SENTIMENT_MAX_TRACKED_SYMBOLS:
+            self._aggregates.popitem(last=False)
+        while len(self._news_windows) > settings.SENTIMENT_MAX_TRACKED_SYMBOLS:
+            self._news_windows.popitem(last=False)
+        return aggregate
+
+    def track(self, symbol: str):
+        """
+            Mantiene al día en segundo plano el sentimiento del símbolo. Se llama tras cada predicción correcta,
+            así un símbolo inexistente nunca se refresca; deja de refrescarse si no se vuelve a pedir en
+            SENTIMENT_TRACK_TTL_SECONDS.
+        """
+        self._tracked_symbols[symbol] = time.time()
+        self._tracked_symbols.move_to_end(symbol)
+        while len(self._tracked_symbols) > settings.SENTIMENT_MAX_TRACKED_SYMBOLS:
+            self._tracked_symbols.popitem(last=False)
+
+    def _expire_tracked(self, now: float = None):
+        # Ordenado por último uso: los caducados están al principio
+        limit = (time.time() if now is None else now) - settings.SENTIMENT_TRACK_TTL_SECONDS
+        while self._tracked_symbols and next(iter(self._tracked_symbols.values())) < limit:
+            self._tracked_symbols.popitem(last=False)
+
+    async def get_news_sentiment(self, symbol: str):
+        """
+            Sentimiento medio de las noticias recientes (-1 a 1). Solo descarga el feed si aún no
+            hay agregado para el símbolo; después lo mantiene al día la tarea en segundo plano (ver track).
+        """
+        aggregate = self._aggregates.get(symbol)
+        if aggregate is None or time.time() - aggregate["updated_at"] > 2 * settings.SENTIMENT_REFRESH_SECONDS:
+            news = await self.get_news(symbol)
+            # Si el agregado se descartó pero el feed sigue en caché, se recalcula con ese feed
+            aggregate = self._aggregates.get(symbol) or self._update_aggregate(symbol, news)
+        return aggregate["score"]
+
+    async def refresh(self, symbol: str):
+        news = await self._download_news(symbol, 10)
+        self.feed_cache.set(("news", symbol, 10), news)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(settings.SENTIMENT_REFRESH_SECONDS)
+            self._expire_tracked()
+            semaphore = asyncio.Semaphore(settings.SENTIMENT_REFRESH_CONCURRENCY)
+
+            async def refresh_one(symbol):
+                async with semaphore:
+                    try:
+                        await self.refresh(symbol)
+                    except Exception as e:
+                        logger.warning(f"No se pudo refrescar el sentimiento de {symbol}: {e}")
+
+            await asyncio.gather(*(refresh_one(symbol) for symbol in list(self._tracked_symbols)))
+
+    def stats(self):
+        lookups = self.score_hits + self.score_misses
+        return {
+            "feeds": self.feed_cache.stats(),
+            "scores": {
+                "entries": len(self._scores),
+                "hits": self.score_hits,
+                "misses": self.score_misses,
+                "hit_rate": self.score_hits / lookups if lookups else 0.0,
+            },
+            "tracked_symbols": len(self._tracked_symbols),
+        }
+
+
+sentiment_service = SentimentService()
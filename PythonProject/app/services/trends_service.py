@@ -0,0 +1,109 @@
+import asyncio
+import logging
+import queue
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from app.config import settings
+from app.utils.cache import AsyncTTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class TrendsService:
+    """
+        Consulta Google Trends sin bloquear el event loop.
+        - pytrends es síncrono: las consultas corren en un pool de hilos que limita la concurrencia.
+        - Las sesiones de TrendReq (y sus cookies) se reutilizan entre consultas.
+        - Los resultados se cachean por (símbolo, timeframe) y los más pedidos se refrescan en segundo plano.
+    """
+
+    def __init__(self):
+        # El pool se crea en start() (o con la primera consulta) y stop() lo cierra
+        self.executor = None
+        self.cache = AsyncTTLCache(settings.TRENDS_CACHE_MAX_ENTRIES, settings.TRENDS_CACHE_TTL_SECONDS)
+        self._sessions = queue.SimpleQueue()
+        self._popularity = Counter()
+        self._task = None
+
+    def _acquire_session(self):
+        try:
+            return self._sessions.get_nowait()
+        except queue.Empty:
+            # pytrends (y pandas con él) solo se importa con la primera consulta
+            from pytrends.request import TrendReq
+            return TrendReq()
+
+    def _fetch(self, symbol: str, timeframe: str):
+        query = f"{symbol} cryptocurrency"
+        # Cada sesión la usa un único hilo a la vez
+        session = self._acquire_session()
+        try:
+            session.build_payload([query], timeframe=timeframe)
+            trends_data = session.interest_over_time()
+        finally:
+            self._sessions.put(session)
+
+        if trends_data.empty:
+            raise Exception("No se encontraron datos de tendencias.")
+
+        dates = trends_data.index.strftime("%Y-%m-%d")
+        popularity = trends_data[query].astype(int).tolist()
+        return [{"date": date, "popularity": value} for date, value in zip(dates, popularity)]
+
+    def _ensure_executor(self):
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=settings.TRENDS_MAX_CONCURRENCY, thread_name_prefix="trends")
+        return self.executor
+
+    async def _fetch_async(self, symbol: str, timeframe: str):
+        return await asyncio.get_running_loop().run_in_executor(self._ensure_executor(), self._fetch, symbol, timeframe)
+
+    async def get_trends(self, symbol: str, timeframe: str = "today 3-m"):
+        """
+            Obtiene datos de Google Trends para una criptomoneda específica.
+            :return: Lista de datos de tendencias (fecha y popularidad).
+        """
+        self._popularity[(symbol, timeframe)] += 1
+        # Las claves vienen de la petición: se conservan solo las más pedidas para acotar la memoria
+        if len(self._popularity) > 2 * settings.TRENDS_CACHE_MAX_ENTRIES:
+            self._popularity = Counter(dict(self._popularity.most_common(settings.TRENDS_CACHE_MAX_ENTRIES)))
+        return await self.cache.get_or_compute(
+            (symbol, timeframe),
+            lambda: self._fetch_async(symbol, timeframe)
+        )
+
+    def start(self):
+        self._ensure_executor()
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(settings.TRENDS_REFRESH_SECONDS)
+            popular = [key for key, _ in self._popularity.most_common(settings.TRENDS_REFRESH_TOP)]
+            # Se reduce el peso de las peticiones antiguas para que la lista siga a la demanda actual
+            self._popularity = Counter({key: count // 2 for key, count in self._popularity.items() if count > 1})
+            for symbol, timeframe in popular:
+                try:
+                    self.cache.set((symbol, timeframe), await self._fetch_async(symbol, timeframe))
+                except Exception as e:
+                    logger.warning(f"No se pudieron refrescar las tendencias de {symbol}: {e}")
+
+    def stats(self):
+        return {"cache": self.cache.stats(), "sessions": self._sessions.qsize()}
+
+
+trends_service = TrendsService()
@@ -0,0 +1,111 @@
+import time
+from contextlib import contextmanager
+
+from app.config import settings
+
+try:
+    from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest
+    from prometheus_client.core import GaugeMetricFamily
+except ImportError:
+    CollectorRegistry = None
+
+# Latencias desde 5 ms (caché) hasta 60 s (ajuste de modelos en frío)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class _NullMetric:
+    # Sustituto cuando prometheus_client no está instalado o las métricas están desactivadas
+    def labels(self, *args, **kwargs):
+        return self
+
+    def observe(self, value):
+        pass
+
+    def inc(self, amount=1):
+        pass
+
+
+def _flatten(stats: dict, prefix: str = ""):
+    for key, value in stats.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            yield from _flatten(value, f"{name}_")
+        elif isinstance(value, (int, float)):
+            yield name, float(value)
+
+
+class StatsCollector:
+    """
+        Expone como gauges los stats() de los componentes (cachés, pools, servicios) en cada lectura de /metrics,
+        sin instrumentar su camino caliente.
+    """
+
+    def __init__(self):
+        self.sources = {}
+
+    def collect(self):
+        gauge = GaugeMetricFamily(
+            "crypto_api_component_stat", "Estadísticas internas de los componentes", labels=["component", "stat"]
+        )
+        for component, stats in list(self.sources.items()):
+            try:
+                values = list(_flatten(stats()))
+            except Exception:
+                continue
+            for stat, value in values:
+                gauge.add_metric([component, stat], value)
+        yield gauge
+
+
+enabled = settings.METRICS_ENABLED and CollectorRegistry is not None
+stats_collector = StatsCollector()
+
+if enabled:
+    registry = CollectorRegistry()
+    registry.register(stats_collector)
+    REQUEST_DURATION = Histogram(
+        "crypto_api_request_duration_seconds", "Duración de las peticiones HTTP",
+        ["method", "route", "status"], buckets=LATENCY_BUCKETS, registry=registry,
+    )
+    STAGE_DURATION = Histogram(
+        "crypto_api_stage_duration_seconds", "Duración de cada etapa de las operaciones principales",
+        ["operation", "stage"], buckets=LATENCY_BUCKETS, registry=registry,
+    )
+    UPSTREAM_DURATION = Histogram(
+        "crypto_api_upstream_request_duration_seconds", "Duración de cada intento de petición a APIs externas",
+        ["upstream", "status"], buckets=LATENCY_BUCKETS, registry=registry,
+    )
+    UPSTREAM_RETRIES = Counter(
+        "crypto_api_upstream_retries_total", "Reintentos de peticiones a APIs externas",
+        ["upstream", "reason"], registry=registry,
+    )
+    UPSTREAM_ERRORS = Counter(
+        "crypto_api_upstream_errors_total", "Peticiones a APIs externas fallidas tras los reintentos",
+        ["upstream", "reason"], registry=registry,
+    )
+else:
+    registry = None
+    REQUEST_DURATION = STAGE_DURATION = UPSTREAM_DURATION = UPSTREAM_RETRIES = UPSTREAM_ERRORS = _NullMetric()
+
+
+def register_stats_source(component: str, stats):
+    """
+        :param stats: Función sin argumentos que devuelve un diccionario (anidado) de valores numéricos.
+    """
+    stats_collector.sources[component] = stats
+
+
+@contextmanager
+def timed(operation: str, stage: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_DURATION.labels(operation, stage).observe(time.perf_counter() - start)
+
+
+def render():
+    """
+        :return: (cuerpo, content type) en formato de exposición de Prometheus.
+    """
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,72 @@
+import cProfile
+import logging
+import os
+import random
+import re
+import time
+
+from app.config import settings
+from app.utils.metrics import REQUEST_DURATION
+
+logger = logging.getLogger(__name__)
+
+
+class InstrumentationMiddleware:
+    """
+        Middleware ASGI: histograma de duración por ruta (plantilla, no la URL concreta) y,
+        si PROFILE_SLOW_REQUESTS está activo, perfilado con cProfile de una muestra de peticiones.
+        El perfil solo se guarda (en PROFILE_DIR) si la petición supera PROFILE_SLOW_THRESHOLD_SECONDS.
+        cProfile mide todo el hilo: el perfil incluye también lo que el event loop atendió mientras tanto.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._profiling = False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        response = {"status": 500, "streaming": False}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                headers = dict(message.get("headers") or [])
+                response["streaming"] = headers.get(b"content-type", b"").startswith(b"text/event-stream")
+            await send(message)
+
+        profiler = self._start_profiler()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            route = scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            # Las conexiones SSE duran lo que el cliente quiera: no son latencia
+            if not response["streaming"]:
+                REQUEST_DURATION.labels(scope["method"], route_path, str(response["status"])).observe(elapsed)
+            if profiler is not None:
+                self._stop_profiler(profiler, scope["method"], route_path, elapsed)
+
+    def _start_profiler(self):
+        # Un solo perfil a la vez: cProfile no admite perfiles anidados en el mismo hilo
+        if not settings.PROFILE_SLOW_REQUESTS or self._profiling or random.random() >= settings.PROFILE_SAMPLE_RATE:
+            return None
+        self._profiling = True
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    def _stop_profiler(self, profiler, method: str, route_path: str, elapsed: float):
+        profiler.disable()
+        self._profiling = False
+        if elapsed < settings.PROFILE_SLOW_THRESHOLD_SECONDS:
+            return
+        os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+        name = re.sub(r"[^A-Za-z0-9]+", "_", f"{method}_{route_path}").strip("_")
+        path = os.path.join(settings.PROFILE_DIR, f"{int(time.time() * 1000)}_{name}.prof")
+        profiler.dump_stats(path)
+        logger.warning(f"Petición lenta {method} {route_path} ({elapsed:.2f}s): perfil guardado en {path}")
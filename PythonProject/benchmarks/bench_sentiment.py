@@ -0,0 +1,62 @@
+# Uso (desde PythonProject): python -m benchmarks.bench_sentiment --symbols 50
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from benchmarks.stub_servers import create_news_app, create_reddit_app, serve
+
+
+async def _timed(coroutines):
+    start = time.perf_counter()
+    await asyncio.gather(*coroutines)
+    return time.perf_counter() - start
+
+
+async def run(symbols: list):
+    # Importación diferida: la configuración se lee del entorno ya apuntando a los servidores locales
+    from app.services.http_client import close_http_clients
+    from app.services.sentiment_service import SentimentService
+
+    service = SentimentService()
+    results = {"symbols": len(symbols)}
+
+    # En frío: descarga del feed y puntuación de todos los titulares
+    results["news_cold_s"] = await _timed(service.get_news(symbol) for symbol in symbols)
+    # En caliente: feed cacheado
+    results["news_warm_s"] = await _timed(service.get_news(symbol) for symbol in symbols)
+    # Feed caducado pero titulares ya puntuados: solo la descarga
+    for symbol in symbols:
+        service.feed_cache.invalidate(("news", symbol, 10))
+    results["news_rescored_s"] = await _timed(service.get_news(symbol) for symbol in symbols)
+    # Sentimiento agregado que lee PredictionService
+    results["aggregate_warm_s"] = await _timed(service.get_news_sentiment(symbol) for symbol in symbols)
+
+    results["reddit_cold_s"] = await _timed(service.get_reddit_comments(symbol) for symbol in symbols)
+    results["reddit_warm_s"] = await _timed(service.get_reddit_comments(symbol) for symbol in symbols)
+    results["stats"] = service.stats()
+
+    await close_http_clients()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark del pipeline de sentimiento (en frío y en caliente)")
+    parser.add_argument("--symbols", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.0, help="Latencia simulada de los servidores (s)")
+    args = parser.parse_args(argv)
+
+    with serve(create_news_app(latency=args.latency)) as news_url, \
+            serve(create_reddit_app(latency=args.latency)) as reddit_url:
+        os.environ["GOOGLE_NEWS_BASE_URL"] = news_url
+        os.environ["REDDIT_BASE_URL"] = reddit_url
+        symbols = [f"SYM{i}" for i in range(args.symbols)]
+        results = asyncio.run(run(symbols))
+
+    print(json.dumps(results, indent=2))
+    return results
+
+
+if __name__ == "__main__":
+    main()
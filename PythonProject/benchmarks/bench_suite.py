@@ -0,0 +1,284 @@
+# Uso (desde PythonProject): python -m benchmarks.bench_suite --symbols 20 --candles 1500
+# Necesita PostgreSQL (DATABASE_URL); Binance, Google News y Reddit se sustituyen por servidores locales.
+# Los símbolos BENCH* se borran al terminar. Comparar ejecuciones: python -m benchmarks.compare
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import httpx
+import numpy as np
+import pandas as pd
+
+from benchmarks.stub_servers import create_binance_app, create_news_app, create_reddit_app, serve
+from benchmarks.synthetic import INTERVAL_MS, generate_ohlcv, to_candles
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+SYMBOL_PREFIX = "BENCH"
+
+# Endpoints medidos en la fase de carga: (nombre, ruta con {symbol})
+ENDPOINTS = [
+    ("ping", "/ping"),
+    ("realtime", "/api/v1/crypto/cryptos/{symbol}/realtime"),
+    ("indicators", "/api/v1/crypto/cryptos/{symbol}/indicators"),
+    ("predict_short", "/api/v1/crypto/cryptos/{symbol}/predict?timeframe=short"),
+    ("predict_long", "/api/v1/crypto/cryptos/{symbol}/predict?timeframe=long"),
+    ("news", "/api/v1/crypto/cryptos/{symbol}/news"),
+]
+
+
+def percentiles(latencies_s: list, prefix: str = ""):
+    p50, p99 = np.percentile(np.asarray(latencies_s) * 1000, [50, 99])
+    return {f"{prefix}p50_ms": float(p50), f"{prefix}p99_ms": float(p99)}
+
+
+async def _timed_call(coroutine):
+    start = time.perf_counter()
+    result = await coroutine
+    return time.perf_counter() - start, result
+
+
+async def bench_ingestion(symbols: list, candles: int, concurrency: int):
+    from app.database.database import AsyncSessionLocal
+    from app.services.crypto_service import CryptoService
+
+    service = CryptoService()
+    semaphore = asyncio.Semaphore(concurrency)
+    start_time = int(time.time() * 1000) - candles * INTERVAL_MS["1d"]
+
+    async def per_symbol(call):
+        async with semaphore, AsyncSessionLocal() as db:
+            return await _timed_call(call(db))
+
+    # Histórico completo desde Binance: descarga + upsert + rollup a 1w + commit + indicadores
+    start = time.perf_counter()
+    backfilled = await asyncio.gather(*(
+        per_symbol(lambda db, symbol=symbol: service.backfill_historical_data(symbol, "1d", start_time, db=db))
+        for symbol in symbols
+    ))
+    backfill_s = time.perf_counter() - start
+    rows = sum(saved for _, saved in backfilled)
+
+    # Actualización incremental (lo que hace POST /historical): solo las velas desde la última guardada
+    refreshed = await asyncio.gather(*(
+        per_symbol(lambda db, symbol=symbol: service.save_historical_data_to_db(symbol, "1d", db))
+        for symbol in symbols
+    ))
+
+    # Reescritura sin red: upsert de velas ya existentes (rama ON CONFLICT) y rollup
+    payloads = {symbol: to_candles(generate_ohlcv(symbol, candles, "1d")) for symbol in symbols}
+    start = time.perf_counter()
+    rewritten = await asyncio.gather(*(
+        per_symbol(lambda db, symbol=symbol: service.store_historical_data(symbol, "1d", payloads[symbol], db))
+        for symbol in symbols
+    ))
+    rewrite_s = time.perf_counter() - start
+
+    return {
+        "backfill_rows_per_s": rows / backfill_s,
+        **percentiles([elapsed for elapsed, _ in backfilled], "backfill_symbol_"),
+        **percentiles([elapsed for elapsed, _ in refreshed], "refresh_"),
+        "rewrite_rows_per_s": sum(saved for _, saved in rewritten) / rewrite_s,
+    }
+
+
+def bench_indicators(symbols: list, candles: int):
+    from app.predictor.indicators import IndicatorEngine, add_grouped_technical_indicators
+
+    series = {symbol: generate_ohlcv(symbol, candles, "1d") for symbol in symbols}
+    total = len(symbols) * candles
+
+    # Siembra del motor incremental (primera consulta de un símbolo)
+    engine = IndicatorEngine()
+    start = time.perf_counter()
+    for symbol, ohlcv in series.items():
+        engine.seed(symbol, "1d", ohlcv["timestamp"], ohlcv["close"])
+    seed_s = time.perf_counter() - start
+
+    # Velas nuevas una a una sobre un estado ya sembrado con la primera mitad
+    half = candles // 2
+    for symbol, ohlcv in series.items():
+        engine.seed(symbol, "1d", ohlcv["timestamp"][:half], ohlcv["close"][:half])
+    updates = {symbol: to_candles({column: values[half:] for column, values in ohlcv.items()})
+               for symbol, ohlcv in series.items()}
+    start = time.perf_counter()
+    for symbol, candles_list in updates.items():
+        for candle in candles_list:
+            engine.ingest(symbol, "1d", [candle])
+    ingest_s = time.perf_counter() - start
+
+    # Versión vectorizada para muchos símbolos (lotes y backtest)
+    frame = pd.concat(
+        [pd.DataFrame({"symbol": symbol, **ohlcv}) for symbol, ohlcv in series.items()], ignore_index=True
+    )
+    start = time.perf_counter()
+    add_grouped_technical_indicators(frame)
+    grouped_s = time.perf_counter() - start
+
+    return {
+        "seed_candles_per_s": total / seed_s,
+        "ingest_candles_per_s": len(symbols) * (candles - half) / ingest_s,
+        "grouped_rows_per_s": total / grouped_s,
+    }
+
+
+async def bench_predict(symbols: list, timeframes=("short", "long")):
+    from app.database.database import AsyncSessionLocal
+    from app.predictor.prediction_service import PredictionService
+
+    results = {}
+    for timeframe in timeframes:
+        # cold: ajuste del modelo; warm: modelo del registro sin predicción cacheada; cached: caché de predicciones
+        cold_service, warm_service = PredictionService(), PredictionService()
+        latencies = {"cold": [], "warm": [], "cached": []}
+        async with AsyncSessionLocal() as db:
+            for symbol in symbols:
+                for phase, service in (("cold", cold_service), ("warm", warm_service), ("cached", warm_service)):
+                    elapsed, _ = await _timed_call(service.predict_crypto_price(symbol, timeframe, db))
+                    latencies[phase].append(elapsed)
+        results[timeframe] = {
+            metric: value
+            for phase, values in latencies.items()
+            for metric, value in percentiles(values, f"{phase}_").items()
+        }
+    return results
+
+
+async def bench_endpoints(base_url: str, symbols: list, requests: int, concurrency: int):
+    results = {}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        for name, path in ENDPOINTS:
+            urls = [path.format(symbol=symbols[i % len(symbols)]) for i in range(requests)]
+            # Calentamiento: una petición por símbolo (cachés del proceso y conexiones abiertas)
+            await asyncio.gather(*(client.get(url) for url in urls[:len(symbols)]))
+
+            semaphore = asyncio.Semaphore(concurrency)
+            latencies, errors = [], 0
+
+            async def request(url):
+                nonlocal errors
+                async with semaphore:
+                    elapsed, response = await _timed_call(client.get(url))
+                latencies.append(elapsed)
+                if response.status_code >= 400:
+                    errors += 1
+
+            start = time.perf_counter()
+            await asyncio.gather(*(request(url) for url in urls))
+            elapsed = time.perf_counter() - start
+            results[name] = {**percentiles(latencies), "requests_per_s": requests / elapsed, "errors": errors}
+    return results
+
+
+async def _reset_symbols(symbols: list):
+    from app.database.database import AsyncSessionLocal, async_engine
+    from app.services.crypto_service import CryptoService
+
+    service = CryptoService()
+    async with AsyncSessionLocal() as db:
+        for symbol in symbols:
+            await service.delete_crypto_and_historical_data(symbol, db)
+    await async_engine.dispose()
+
+
+async def _run_offline(symbols: list, args):
+    from app.database.database import async_engine
+    from app.services.http_client import close_http_clients
+
+    results = {"ingestion": await bench_ingestion(symbols, args.candles, args.concurrency)}
+    results["indicators"] = bench_indicators(symbols, args.candles)
+    results["predict"] = await bench_predict(symbols)
+    # El servidor de la fase de carga tiene su propio event loop: no se reutilizan conexiones de este
+    await close_http_clients()
+    await async_engine.dispose()
+    return results
+
+
+def flatten(results: dict, prefix: str = ""):
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        else:
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(__file__)).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_results(report: dict, output: str = None, kind: str = "suite"):
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        output = os.path.join(RESULTS_DIR, f"{stamp}_{kind}_{report['meta']['commit'] or 'nogit'}.json")
+    with open(output, "w") as file:
+        json.dump(report, file, indent=2)
+    return output
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de ingesta, indicadores, predicción y endpoints")
+    parser.add_argument("--symbols", type=int, default=20)
+    parser.add_argument("--candles", type=int, default=1500, help="Velas diarias sintéticas por símbolo")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--concurrency", type=int, default=20, help="Peticiones simultáneas en las fases concurrentes")
+    parser.add_argument("--requests", type=int, default=500, help="Peticiones por endpoint en la fase de carga")
+    parser.add_argument("--latency", type=float, default=0.0, help="Latencia simulada de los servidores (s)")
+    parser.add_argument("--output", help="Fichero de resultados (por defecto benchmarks/results/<fecha>_suite_<commit>.json)")
+    args = parser.parse_args(argv)
+
+    symbols = [f"{SYMBOL_PREFIX}{i}" for i in range(args.symbols)]
+    with tempfile.TemporaryDirectory() as model_store, \
+            serve(create_binance_app(candles=args.candles, seed=args.seed, latency=args.latency)) as binance_url, \
+            serve(create_news_app(latency=args.latency)) as news_url, \
+            serve(create_reddit_app(latency=args.latency)) as reddit_url:
+        os.environ["BINANCE_BASE_URL"] = binance_url
+        os.environ["GOOGLE_NEWS_BASE_URL"] = news_url
+        os.environ["REDDIT_BASE_URL"] = reddit_url
+        # Modelos en un directorio temporal: la primera predicción de cada símbolo siempre ajusta
+        os.environ["MODEL_STORE_DIR"] = model_store
+        # Sin websocket de Binance (realtime va al servidor local) y con el orden ARIMA fijo para que sea reproducible
+        os.environ.setdefault("PRICE_HUB_ENABLED", "false")
+        os.environ.setdefault("ARIMA_ORDER_SELECTION", "fixed")
+
+        asyncio.run(_reset_symbols(symbols))
+        try:
+            results = asyncio.run(_run_offline(symbols, args))
+            # Importación diferida: app.main lee la configuración al importarse
+            from app.main import app
+            with serve(app) as api_url:
+                results["endpoints"] = asyncio.run(bench_endpoints(api_url, symbols, args.requests, args.concurrency))
+        finally:
+            asyncio.run(_reset_symbols(symbols))
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "params": vars(args),
+        },
+        "metrics": flatten(results),
+    }
+    path = save_results(report, args.output)
+    print(json.dumps(report["metrics"], indent=2))
+    print(f"Resultados guardados en {path}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
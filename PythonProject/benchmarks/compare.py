@@ -0,0 +1,86 @@
+# Uso (desde PythonProject): python -m benchmarks.compare [base.json candidato.json] --threshold 0.1
+# Sin ficheros compara las dos últimas ejecuciones de benchmarks/results del tipo indicado (--kind suite|startup).
+# Devuelve 1 si hay regresiones.
+import argparse
+import glob
+import json
+import math
+import os
+import sys
+
+from benchmarks.bench_suite import RESULTS_DIR
+
+
+def higher_is_better(metric: str):
+    return metric.endswith("_per_s")
+
+
+def relative_change(metric: str, baseline: float, candidate: float):
+    """
+        Cambio relativo con signo orientado: positivo es mejora y negativo empeoramiento.
+    """
+    if baseline == 0:
+        if candidate == 0:
+            return 0.0
+        worse = candidate < 0 if higher_is_better(metric) else candidate > 0
+        return -math.inf if worse else math.inf
+    change = (candidate - baseline) / abs(baseline)
+    return change if higher_is_better(metric) else -change
+
+
+def compare(baseline: dict, candidate: dict, threshold: float):
+    rows = []
+    for metric in sorted(baseline["metrics"].keys() & candidate["metrics"].keys()):
+        before, after = baseline["metrics"][metric], candidate["metrics"][metric]
+        if not isinstance(before, (int, float)) or not isinstance(after, (int, float)):
+            continue
+        change = relative_change(metric, before, after)
+        rows.append({
+            "metric": metric,
+            "baseline": before,
+            "candidate": after,
+            "change": change,
+            "regression": change < -threshold,
+        })
+    return rows
+
+
+def latest_results(kind: str, count: int = 2):
+    paths = sorted(glob.glob(os.path.join(RESULTS_DIR, f"*_{kind}_*.json")))
+    if len(paths) < count:
+        raise SystemExit(f"Se necesitan al menos {count} resultados en {RESULTS_DIR}")
+    return paths[-count:]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compara dos ejecuciones de los benchmarks")
+    parser.add_argument("files", nargs="*", help="Resultado base y resultado candidato")
+    parser.add_argument("--kind", default="suite", help="Tipo de resultado cuando no se indican ficheros")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Empeoramiento relativo a partir del cual se marca una regresión")
+    args = parser.parse_args(argv)
+
+    if len(args.files) not in (0, 2):
+        parser.error("Indica dos ficheros o ninguno")
+    baseline_path, candidate_path = args.files or latest_results(args.kind)
+    with open(baseline_path) as file:
+        baseline = json.load(file)
+    with open(candidate_path) as file:
+        candidate = json.load(file)
+
+    rows = compare(baseline, candidate, args.threshold)
+    print(f"base: {baseline['meta'].get('commit')} ({baseline_path})")
+    print(f"candidato: {candidate['meta'].get('commit')} ({candidate_path})")
+    for row in rows:
+        flag = "REGRESIÓN" if row["regression"] else ""
+        print(f"{row['metric']:<45} {row['baseline']:>14.3f} {row['candidate']:>14.3f} {row['change']:>+9.1%} {flag}")
+
+    regressions = [row["metric"] for row in rows if row["regression"]]
+    if baseline["meta"].get("params") != candidate["meta"].get("params"):
+        print("Aviso: las ejecuciones usan parámetros distintos")
+    print(f"{len(regressions)} regresiones (umbral {args.threshold:.0%})")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+# Servidores locales que sustituyen a las APIs externas durante los benchmarks
+import asyncio
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import formatdate
+from functools import lru_cache
+from xml.sax.saxutils import escape
+
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, HTTPException, Response
+
+from benchmarks.synthetic import INTERVAL_MS, generate_ohlcv
+
+HEADLINE_TEMPLATES = [
+    "{symbol} rallies as investors celebrate strong gains",
+    "{symbol} crashes amid fears of a terrible regulatory crackdown",
+    "{symbol} trading volume steady ahead of the weekly close",
+    "Analysts see great upside for {symbol} after upgrade",
+    "{symbol} holders worried about losses after exchange hack",
+]
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def serve(app):
+    """
+        Arranca la app en un hilo con uvicorn y devuelve su URL base.
+    """
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+def headlines(symbol: str, count: int):
+    return [
+        f"{HEADLINE_TEMPLATES[i % len(HEADLINE_TEMPLATES)].format(symbol=symbol)} #{i}"
+        for i in range(count)
+    ]
+
+
+def create_news_app(items_per_feed: int = 20, latency: float = 0.0):
+    app = FastAPI()
+
+    @app.get("/rss/search")
+    async def rss_search(q: str):
+        if latency:
+            await asyncio.sleep(latency)
+        symbol = q.split()[0]
+        items = "".join(
+            f"<item><title>{escape(title)}</title><link>https://example.com/{symbol}/{i}</link>"
+            f"<pubDate>{formatdate(usegmt=True)}</pubDate></item>"
+            for i, title in enumerate(headlines(symbol, items_per_feed))
+        )
+        return Response(f"<rss><channel>{items}</channel></rss>", media_type="application/rss+xml")
+
+    return app
+
+
+def create_reddit_app(latency: float = 0.0):
+    app = FastAPI()
+
+    @app.get("/reddit/search/comment/")
+    async def search_comments(q: str, size: int = 10):
+        if latency:
+            await asyncio.sleep(latency)
+        now = int(time.time())
+        return {"data": [{"body": body, "created_utc": now - i} for i, body in enumerate(headlines(q, size))]}
+
+    return app
+
+
+def create_binance_app(candles: int = 1000, seed: int = 0, latency: float = 0.0):
+    """
+        Binance con un histórico sintético de `candles` velas por (símbolo, intervalo) que termina
+        en la vela actual. Cada serie se genera una vez y se sirve por ventanas como /klines.
+    """
+    app = FastAPI()
+    end_ms = int(time.time() * 1000)
+
+    @lru_cache(maxsize=None)
+    def history(symbol: str, interval: str):
+        return generate_ohlcv(symbol, candles, interval, end_ms=end_ms, seed=seed)
+
+    async def _wait():
+        if latency:
+            await asyncio.sleep(latency)
+
+    @app.get("/klines")
+    async def klines(symbol: str, interval: str, limit: int = 500, startTime: int = None, endTime: int = None):
+        await _wait()
+        if interval not in INTERVAL_MS:
+            raise HTTPException(status_code=400, detail="Invalid interval.")
+        ohlcv = history(symbol, interval)
+        timestamps = ohlcv["timestamp"]
+        first = 0 if startTime is None else int(np.searchsorted(timestamps, startTime, side="left"))
+        last = len(timestamps) if endTime is None else int(np.searchsorted(timestamps, endTime, side="right"))
+        if startTime is None:
+            first = max(first, last - limit)
+        last = min(last, first + limit)
+        return [
+            [int(timestamps[i]), str(ohlcv["open"][i]), str(ohlcv["high"][i]), str(ohlcv["low"][i]),
+             str(ohlcv["close"][i]), str(ohlcv["volume"][i]), int(timestamps[i]) + INTERVAL_MS[interval] - 1]
+            for i in range(first, last)
+        ]
+
+    @app.get("/ticker/price")
+    async def ticker_price(symbol: str):
+        await _wait()
+        return {"symbol": symbol, "price": str(history(symbol.removesuffix("USDT"), "1d")["close"][-1])}
+
+    @app.get("/ticker/24hr")
+    async def ticker_24hr(symbol: str):
+        await _wait()
+        ohlcv = history(symbol.removesuffix("USDT"), "1d")
+        return {
+            "symbol": symbol,
+            "lastPrice": str(ohlcv["close"][-1]),
+            "openPrice": str(ohlcv["open"][-1]),
+            "volume": str(ohlcv["volume"][-1]),
+        }
+
+    return app
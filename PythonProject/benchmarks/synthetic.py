@@ -0,0 +1,46 @@
+# Históricos de velas sintéticos y reproducibles (misma semilla y símbolo -> mismas velas)
+import zlib
+
+import numpy as np
+
+# Independiente de app.*: los servidores de prueba se crean antes de configurar la app
+INTERVAL_MS = {"1h": 3_600_000, "1d": 86_400_000, "1w": 7 * 86_400_000}
+
+
+def symbol_seed(symbol: str, seed: int = 0):
+    return zlib.crc32(symbol.encode()) + seed
+
+
+def generate_ohlcv(symbol: str, n_candles: int, interval: str = "1d", end_ms: int = None, seed: int = 0,
+                   start_price: float = 100.0, volatility: float = 0.03):
+    """
+        Paseo aleatorio geométrico con velas OHLCV coherentes (high/low envuelven open y close).
+        :param end_ms: Apertura de la última vela; por defecto la vela de hoy.
+        :return: Diccionario columna -> array, con timestamps alineados al intervalo.
+    """
+    interval_ms = INTERVAL_MS[interval]
+    if end_ms is None:
+        end_ms = int(np.datetime64("now", "ms").astype(np.int64))
+    end_ms -= end_ms % interval_ms
+
+    rng = np.random.default_rng(symbol_seed(symbol, seed))
+    closes = start_price * np.exp(np.cumsum(rng.normal(0.0005, volatility, size=n_candles)))
+    opens = np.concatenate([[start_price], closes[:-1]])
+    wick = np.abs(rng.normal(0, volatility / 2, size=(2, n_candles)))
+    return {
+        "timestamp": end_ms - interval_ms * np.arange(n_candles - 1, -1, -1, dtype=np.int64),
+        "open": opens,
+        "high": np.maximum(opens, closes) * (1 + wick[0]),
+        "low": np.minimum(opens, closes) * (1 - wick[1]),
+        "close": closes,
+        "volume": rng.lognormal(10, 1, size=n_candles),
+    }
+
+
+def to_candles(ohlcv: dict):
+    # Mismo formato que CryptoService.get_historical_data_service
+    columns = ("timestamp", "open", "high", "low", "close", "volume")
+    return [
+        {column: (int(value) if column == "timestamp" else float(value)) for column, value in zip(columns, row)}
+        for row in zip(*(ohlcv[column] for column in columns))
+    ]
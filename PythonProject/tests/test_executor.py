@@ -0,0 +1,36 @@
+# Recuperación del pool de procesos de los modelos cuando muere un worker
+import asyncio
+import os
+
+import pytest
+
+from app.exceptions.custom_exceptions import PredictorBusyException
+from app.predictor.executor import ModelExecutor
+
+
+def crash_worker():
+    # Como un ajuste que muere por falta de memoria: el proceso termina sin responder
+    os._exit(1)
+
+
+def add(a, b):
+    return a + b
+
+
+def test_broken_process_pool_is_replaced():
+    executor = ModelExecutor("process", max_workers=1, max_pending=4, timeout=60)
+
+    async def run():
+        assert await executor.run(add, 1, 2) == 3
+        broken_pool = executor._pool
+        with pytest.raises(PredictorBusyException):
+            await executor.run(crash_worker)
+        assert executor._pool is None
+        # La siguiente llamada crea un pool nuevo en lugar de fallar para siempre
+        assert await executor.run(add, 2, 3) == 5
+        assert executor._pool is not broken_pool
+
+    try:
+        asyncio.run(run())
+    finally:
+        executor.shutdown()
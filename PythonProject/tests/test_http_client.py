@@ -0,0 +1,145 @@
+# Reintentos, backoff y reutilización del cliente HTTP contra un servidor local
+import asyncio
+import time
+
+import httpx
+import pytest
+from fastapi import FastAPI, Request, Response
+
+from app.services import http_client
+from app.services.http_client import RetryTransport
+from app.services.rate_limiter import RequestWeightLimiter
+from benchmarks.stub_servers import _free_port, serve
+
+
+def create_scripted_app(script: list):
+    """
+        Responde en orden con los (status, cabeceras) de `script` y después con 200.
+        Guarda el puerto de cliente de cada petición para comprobar la reutilización de conexiones.
+    """
+    app = FastAPI()
+    app.state.client_ports = []
+
+    @app.get("/resource")
+    async def resource(request: Request):
+        app.state.client_ports.append(request.client.port)
+        status, headers = script.pop(0) if script else (200, {})
+        return Response("ok", status_code=status, headers=headers)
+
+    return app
+
+
+@pytest.fixture
+def backoffs(monkeypatch):
+    # Registra los intentos que piden backoff y no espera: los tests no dependen del jitter
+    attempts = []
+
+    def fake_backoff(self, attempt):
+        attempts.append(attempt)
+        return 0
+
+    monkeypatch.setattr(RetryTransport, "_backoff", fake_backoff)
+    return attempts
+
+
+async def _get(base_url: str, max_retries: int = 3, weight: int = None, **transport_options):
+    transport = RetryTransport(httpx.AsyncHTTPTransport(), max_retries=max_retries,
+                               backoff_base=0.01, backoff_max=1.0, upstream="test", **transport_options)
+    async with httpx.AsyncClient(base_url=base_url, transport=transport) as client:
+        return await client.get("/resource", extensions={"request_weight": weight} if weight else {})
+
+
+def test_retries_429_and_5xx_with_backoff(backoffs):
+    app = create_scripted_app([(503, {}), (429, {}), (502, {})])
+    with serve(app) as url:
+        response = asyncio.run(_get(url))
+    assert response.status_code == 200
+    assert len(app.state.client_ports) == 4
+    assert backoffs == [0, 1, 2]
+
+
+def test_retry_after_is_honoured(backoffs):
+    app = create_scripted_app([(429, {"Retry-After": "0.3"})])
+    with serve(app) as url:
+        start = time.perf_counter()
+        response = asyncio.run(_get(url))
+        elapsed = time.perf_counter() - start
+    assert response.status_code == 200
+    assert elapsed >= 0.3
+    # Con Retry-After no se usa el backoff exponencial
+    assert backoffs == []
+
+
+def test_retry_after_longer_than_backoff_max_is_waited_in_full(backoffs):
+    # backoff_max es 1 s: el Retry-After no se recorta a ese valor
+    app = create_scripted_app([(429, {"Retry-After": "1.2"})])
+    with serve(app) as url:
+        start = time.perf_counter()
+        response = asyncio.run(_get(url))
+        elapsed = time.perf_counter() - start
+    assert response.status_code == 200
+    assert elapsed >= 1.2
+
+
+def test_retry_after_above_limit_returns_response(backoffs):
+    app = create_scripted_app([(429, {"Retry-After": "120"})])
+    with serve(app) as url:
+        start = time.perf_counter()
+        response = asyncio.run(_get(url, retry_after_max=60))
+        elapsed = time.perf_counter() - start
+    assert response.status_code == 429
+    assert len(app.state.client_ports) == 1
+    assert elapsed < 5
+
+
+def test_retries_are_charged_to_the_weight_limiter(backoffs):
+    app = create_scripted_app([(503, {}), (429, {})])
+    limiter = RequestWeightLimiter(1000)
+    with serve(app) as url:
+        response = asyncio.run(_get(url, weight=5, weight_limiter=limiter))
+    assert response.status_code == 200
+    # El primer intento lo cobra quien hace la petición; los dos reintentos, el transporte
+    assert limiter.stats()["used_weight"] == 10
+
+
+def test_gives_up_after_max_retries(backoffs):
+    app = create_scripted_app([(500, {})] * 5)
+    with serve(app) as url:
+        response = asyncio.run(_get(url, max_retries=2))
+    assert response.status_code == 500
+    assert len(app.state.client_ports) == 3
+
+
+@pytest.mark.parametrize("status", [400, 404, 418])
+def test_non_retryable_status_is_not_retried(backoffs, status):
+    app = create_scripted_app([(status, {})])
+    with serve(app) as url:
+        response = asyncio.run(_get(url))
+    assert response.status_code == status
+    assert len(app.state.client_ports) == 1
+    assert backoffs == []
+
+
+def test_connection_errors_are_retried(backoffs):
+    with pytest.raises(httpx.ConnectError):
+        asyncio.run(_get(f"http://127.0.0.1:{_free_port()}", max_retries=2))
+    assert backoffs == [0, 1]
+
+
+def test_client_is_shared_and_reuses_connections(monkeypatch):
+    app = create_scripted_app([])
+    with serve(app) as url:
+        monkeypatch.setitem(http_client.UPSTREAMS, "binance", {"base_url": url, "http2": False})
+        monkeypatch.setattr(http_client, "_clients", {})
+
+        async def run():
+            client = http_client.get_http_client("binance")
+            for _ in range(3):
+                assert (await client.get("/resource")).status_code == 200
+            same_client = http_client.get_http_client("binance") is client
+            await http_client.close_http_clients()
+            return same_client
+
+        assert asyncio.run(run())
+    # Keep-alive: las tres peticiones van por la misma conexión
+    assert len(set(app.state.client_ports)) == 1
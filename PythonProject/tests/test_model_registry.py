@@ -0,0 +1,45 @@
+# Escrituras concurrentes de modelos en un directorio compartido
+import os
+import threading
+
+from app.predictor.model_registry import ModelRegistry
+
+
+def _entry(watermark: int):
+    return {"symbol": "BTC", "timeframe": "long", "watermark": watermark, "model": "x" * 10_000}
+
+
+def test_concurrent_writers_do_not_fail_and_keep_the_newest(tmp_path):
+    # Un registro por hilo, como varios workers de uvicorn con el mismo MODEL_STORE_DIR
+    errors = []
+
+    def writer(offset: int):
+        try:
+            registry = ModelRegistry(str(tmp_path))
+            for watermark in range(offset, offset + 30):
+                registry.put("BTC", "long", _entry(watermark))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer, args=(offset,)) for offset in range(0, 600, 100)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+    reloaded = ModelRegistry(str(tmp_path))
+    reloaded.load_all()
+    assert reloaded.get("BTC", "long")["watermark"] == 529
+
+
+def test_older_watermark_does_not_remove_newer_model(tmp_path):
+    registry = ModelRegistry(str(tmp_path))
+    registry.put("BTC", "long", _entry(10))
+    registry.put("BTC", "long", _entry(5))
+    assert "BTC_long_10.pkl" in os.listdir(tmp_path)
+
+    reloaded = ModelRegistry(str(tmp_path))
+    reloaded.load_all()
+    assert reloaded.get("BTC", "long")["watermark"] == 10
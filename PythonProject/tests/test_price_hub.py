@@ -0,0 +1,130 @@
+# Reparto de precios del hub a los clientes WebSocket, alimentado por un ticker local
+import asyncio
+import itertools
+import json
+
+import pytest
+from fastapi import FastAPI
+
+from app.endpoints.crypto import CryptoEndpoints
+from app.services import http_client
+from app.services.price_hub import PriceHub
+from benchmarks.stub_servers import serve
+
+
+def create_ticker_app():
+    # /ticker/price de todos los pares: el precio cambia en cada consulta
+    app = FastAPI()
+    counter = itertools.count(1)
+
+    @app.get("/ticker/price")
+    async def ticker_price():
+        tick = next(counter)
+        return [
+            {"symbol": "BTCUSDT", "price": str(100 + tick)},
+            {"symbol": "ETHUSDT", "price": str(10 + tick)},
+            {"symbol": "ETHBTC", "price": "0.05"},
+        ]
+
+    return app
+
+
+class WebSocketClient:
+    """
+        Cliente WebSocket que habla ASGI directamente con la app, en el mismo event loop.
+        Como un servidor real, al desconectarse solo entrega 'websocket.disconnect': no cancela el handler.
+    """
+
+    def __init__(self, app, path: str):
+        self.to_app = asyncio.Queue()
+        self.from_app = asyncio.Queue()
+        scope = {
+            "type": "websocket", "asgi": {"version": "3.0"}, "scheme": "ws", "path": path,
+            "raw_path": path.encode(), "root_path": "", "query_string": b"", "headers": [],
+            "client": ("127.0.0.1", 50000), "server": ("testserver", 80), "subprotocols": [],
+        }
+        self.task = asyncio.create_task(app(scope, self.to_app.get, self.from_app.put))
+
+    async def connect(self):
+        await self.to_app.put({"type": "websocket.connect"})
+        message = await asyncio.wait_for(self.from_app.get(), 5)
+        assert message["type"] == "websocket.accept"
+        return self
+
+    async def receive_json(self):
+        message = await asyncio.wait_for(self.from_app.get(), 5)
+        return json.loads(message["text"])
+
+    async def disconnect(self):
+        await self.to_app.put({"type": "websocket.disconnect", "code": 1000})
+        # El handler debe terminar por sí solo
+        await asyncio.wait_for(self.task, 5)
+
+
+async def wait_until(condition, timeout: float = 5.0):
+    async def poll():
+        while not condition():
+            await asyncio.sleep(0.02)
+
+    await asyncio.wait_for(poll(), timeout)
+
+
+@pytest.fixture
+def ticker_url(monkeypatch):
+    with serve(create_ticker_app()) as url:
+        monkeypatch.setitem(http_client.UPSTREAMS, "binance", {"base_url": url, "http2": False})
+        monkeypatch.setattr(http_client, "_clients", {})
+        yield url
+
+
+def run_with_hub(scenario):
+    # API con el endpoint WebSocket y un PriceHub en modo sondeo contra el ticker local
+    async def run():
+        hub = PriceHub(mode="poll", poll_interval=0.05)
+        endpoints = CryptoEndpoints()
+        endpoints.price_hub = hub
+        app = FastAPI()
+        app.include_router(endpoints.router)
+        hub.start()
+        try:
+            await scenario(app, hub)
+        finally:
+            await hub.stop()
+            await http_client.close_http_clients()
+
+    asyncio.run(run())
+
+
+def test_updates_fan_out_to_every_subscriber(ticker_url):
+    async def scenario(app, hub):
+        await wait_until(lambda: hub.get_price("BTC") is not None)
+        assert hub.stats()["mode"] == "poll"
+        clients = [
+            (await WebSocketClient(app, f"/cryptos/{symbol}/realtime/ws").connect(), symbol)
+            for symbol in ("BTC", "BTC", "ETH")
+        ]
+        assert hub.stats()["subscribers"] == 3
+
+        for client, symbol in clients:
+            prices = [await client.receive_json() for _ in range(3)]
+            assert {message["symbol"] for message in prices} == {symbol}
+            # El primer mensaje es el precio actual y después llegan los cambios
+            assert len({message["price"] for message in prices}) == 3
+
+        for client, _ in clients:
+            await client.disconnect()
+        assert hub.stats()["subscribers"] == 0
+
+    run_with_hub(scenario)
+
+
+def test_idle_subscriber_is_removed_on_disconnect(ticker_url):
+    async def scenario(app, hub):
+        # Símbolo sin precios: el servidor nunca envía nada y solo detecta el cierre leyendo del socket
+        client = await WebSocketClient(app, "/cryptos/IDLE/realtime/ws").connect()
+        assert hub.stats()["subscribers"] == 1
+        await client.disconnect()
+        assert hub.stats()["subscribers"] == 0
+        assert "IDLE" not in hub._subscribers
+
+    run_with_hub(scenario)
@@ -0,0 +1,96 @@
+# Tramos, métricas y pronósticos vectorizados del backtest walk-forward
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.backtest.runner import BacktestRunner
+from app.backtest.walk_forward import _mean_forecasts, evaluate, make_folds
+from app.predictor.fitting import fit_arima
+
+
+def test_folds_cover_the_test_rows_without_gaps():
+    folds = make_folds(n_rows=111, min_train=10, n_folds=4)
+    assert folds == [(10, 35), (35, 60), (60, 85), (85, 110)]
+    # La última fila no tiene cierre siguiente: nunca se evalúa
+    assert folds[-1][1] == 110
+
+
+def test_folds_need_one_row_per_fold():
+    assert make_folds(n_rows=14, min_train=10, n_folds=3) == [(10, 11), (11, 12), (12, 13)]
+    assert make_folds(n_rows=13, min_train=10, n_folds=3) == []
+    assert make_folds(n_rows=5, min_train=10, n_folds=3) == []
+
+
+# Cierres de ejemplo: con umbral 0.05, comprar en la fila 0, aguantar en la 1, vender en la 2 y aguantar en la 3
+CLOSES = np.array([100.0, 110.0, 99.0, 99.0, 120.0])
+DECISIONS = np.arange(4)
+PREDICTED = np.array([120.0, 110.0, 80.0, 99.0])
+REALIZED = CLOSES[1:]
+
+
+def test_evaluate_without_fees():
+    metrics = evaluate(CLOSES, DECISIONS, PREDICTED, REALIZED, threshold=0.05, fee_bps=0, periods_per_year=365)
+
+    assert metrics["signals"] == {"comprar": 1, "aguantar": 2, "vender": 1}
+    # Posición [1, 1, 0, 0]: gana el 10 %, pierde el 10 % y después está fuera
+    assert metrics["exposure"] == 0.5
+    assert metrics["trades"] == 2
+    assert metrics["strategy_return"] == pytest.approx(1.1 * 0.9 - 1)
+    assert metrics["buy_hold_return"] == pytest.approx(0.2)
+    assert metrics["max_drawdown"] == pytest.approx(0.99 / 1.1 - 1)
+    # Errores [10, 11, -19, -21]; solo la fila 0 acierta la dirección
+    assert metrics["mae"] == pytest.approx(15.25)
+    assert metrics["rmse"] == pytest.approx(np.sqrt((10 ** 2 + 11 ** 2 + 19 ** 2 + 21 ** 2) / 4))
+    assert metrics["direction_accuracy"] == 0.25
+
+
+def test_evaluate_charges_fees_per_trade():
+    metrics = evaluate(CLOSES, DECISIONS, PREDICTED, REALIZED, threshold=0.05, fee_bps=10, periods_per_year=365)
+
+    equity = np.cumprod([1 + 0.1 - 0.001, 1 - 0.1, 1 - 0.001, 1])
+    assert metrics["strategy_return"] == pytest.approx(equity[-1] - 1)
+    assert metrics["max_drawdown"] == pytest.approx(equity[-1] / equity[0] - 1)
+
+
+def test_evaluate_ignores_unknown_realized_values():
+    realized = np.array([110.0, 99.0, 99.0, np.nan])
+    metrics = evaluate(CLOSES, DECISIONS, PREDICTED, realized, threshold=0.05, fee_bps=0, periods_per_year=365)
+    assert metrics["predictions"] == 4
+    assert metrics["mae"] == pytest.approx((10 + 11 + 19) / 3)
+
+
+@pytest.mark.parametrize("order", [(5, 1, 0), (2, 1, 2), (1, 0, 1), (0, 2, 1)])
+def test_mean_forecasts_match_forecast_from_each_origin(order):
+    rng = np.random.default_rng(7)
+    closes = 100 + np.cumsum(rng.normal(0, 1, 260))
+    horizon = 30
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        model_fit = fit_arima(closes[:200], order)
+        fast = _mean_forecasts(model_fit.extend(closes[200:]), horizon)
+        # Referencia: extender el modelo ajustado hasta cada origen y pronosticar desde ahí
+        expected = [model_fit.extend(closes[200:end]).forecast(steps=horizon).mean() for end in range(201, 261)]
+
+    assert fast is not None
+    np.testing.assert_allclose(fast, expected, rtol=1e-12)
+
+
+def test_runner_evaluates_each_symbol_and_reports_short_history():
+    rng = np.random.default_rng(3)
+    df = pd.concat([
+        pd.DataFrame({"symbol": "LONG", "close": 100 + np.cumsum(rng.normal(0, 1, 80))}),
+        pd.DataFrame({"symbol": "SHORT", "close": 100 + np.cumsum(rng.normal(0, 1, 30))}),
+    ], ignore_index=True)
+    runner = BacktestRunner(folds=2, min_train={"long": 50}, horizon=5, workers=1)
+
+    report = runner.run({"long": df})
+
+    results = report["results"]["long"]
+    assert results["SHORT"] == {"error": "Not enough historical data for backtesting"}
+    # Filas 50..78: la última vela no tiene cierre siguiente
+    assert results["LONG"]["predictions"] == 29
+    assert report["summary"]["long"]["symbols"] == 1
+    assert report["summary"]["long"]["failed"] == 1